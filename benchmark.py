@@ -0,0 +1,331 @@
+"""Offline throughput benchmark against a local Discourse stand-in.
+
+Starts a small HTTP server that serves synthetic `latest.json?page=N` payloads
+(ending in an `invalid_parameters` page) and `/t/topic/{id}/{n}` pages, points
+water.py and tpread.py at it through LINUX_DO_BASE_URL, and reports pages/s,
+upserts/s, JSON decode cost, request-API vs page-navigation fetch cost,
+reader step latency and peak RSS as one JSON document.
+
+    python benchmark.py --topics 600 --latency-ms 20 --output run.json
+    python benchmark.py --no-browser          # DB / parsing stages only
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+class StandInForum:
+    """Synthetic topic list ordered by bump time, with optional churn on page 0."""
+
+    def __init__(self, topics: int, page_size: int, max_posts: int, churn: int, seed: int = 1) -> None:
+        self.page_size = page_size
+        self.churn = churn
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._clock = 1_700_000_000
+        self.topics: List[Dict[str, object]] = []
+        for topic_id in range(topics, 0, -1):
+            self.topics.append(self._topic(topic_id, self._rng.randint(1, max_posts)))
+
+    def _topic(self, topic_id: int, posts_count: int) -> Dict[str, object]:
+        self._clock += 1
+        stamp = time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(self._clock))
+        return {
+            'id': topic_id,
+            'title': f'Synthetic topic {topic_id}',
+            'posts_count': posts_count,
+            'highest_post_number': posts_count,
+            'bumped_at': stamp,
+            'last_posted_at': stamp,
+            'category_id': topic_id % 12,
+            'views': posts_count * 17,
+            'like_count': posts_count // 3,
+        }
+
+    def latest(self, page: int) -> Dict[str, object]:
+        with self._lock:
+            if page == 0:
+                for _ in range(self.churn):
+                    index = self._rng.randrange(len(self.topics))
+                    bumped = self.topics.pop(index)
+                    self.topics.insert(0, self._topic(int(bumped['id']), int(bumped['posts_count']) + 1))
+            start = page * self.page_size
+            if start >= len(self.topics):
+                return {'error_type': 'invalid_parameters', 'errors': ['page is out of range']}
+            topics = [dict(topic) for topic in self.topics[start:start + self.page_size]]
+        return {'users': [], 'topic_list': {'per_page': self.page_size, 'topics': topics}}
+
+
+def make_handler(forum: StandInForum, latency: float, post_bytes: int, posts_per_page: int):
+    filler = ('lorem ipsum ' * (post_bytes // 12 + 1))[:post_bytes]
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self) -> None:  # noqa: N802 (http.server naming)
+            if latency:
+                time.sleep(latency)
+            parsed = urlparse(self.path)
+            if parsed.path == '/latest.json':
+                page = int(parse_qs(parsed.query).get('page', ['0'])[0])
+                self._send(json.dumps(forum.latest(page)).encode('utf-8'), 'application/json; charset=utf-8')
+            elif parsed.path.startswith('/t/topic/'):
+                parts = parsed.path.strip('/').split('/')
+                first = int(parts[3]) if len(parts) > 3 else 1
+                posts = ''.join(
+                    f'<article id="post_{n}" class="boxed onscreen-post"><div class="cooked"><p>{filler}</p></div></article>'
+                    for n in range(first, first + posts_per_page)
+                )
+                body = f'<!DOCTYPE html><html><body><div class="post-stream">{posts}</div></body></html>'
+                self._send(body.encode('utf-8'), 'text/html; charset=utf-8')
+            else:
+                self.send_error(404)
+
+        def _send(self, body: bytes, content_type: str) -> None:
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args) -> None:  # pylint: disable=redefined-builtin
+            pass
+
+    return Handler
+
+
+def peak_rss_kib() -> Dict[str, int]:
+    """Peak resident set size of this process and of reaped children (the browser)."""
+    return {
+        'self': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'children': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    }
+
+
+def bench_handle_topics(water, forum: StandInForum) -> Dict[str, float]:
+    """Parse/diff every synthetic page through handle_topics, then drain the writer."""
+    pages = []
+    page = 0
+    while True:
+        payload = forum.latest(page)
+        if 'topic_list' not in payload:
+            break
+        pages.append(payload['topic_list']['topics'])
+        page += 1
+    water.topic_writer.start()
+    started = time.perf_counter()
+    changed = sum(water.handle_topics(topics, 'Bench') for topics in pages)
+    handled = time.perf_counter() - started
+    water.topic_writer.stop()
+    drained = time.perf_counter() - started
+    return {
+        'pages': len(pages),
+        'pages_per_second': len(pages) / handled if handled else 0.0,
+        'changed_topics': changed,
+        'upserts_per_second': changed / drained if drained else 0.0,
+    }
+
+
+def bench_decode(water, forum: StandInForum) -> Dict[str, object]:
+    """Compare full stdlib decoding with the projected path on every synthetic page.
+
+    `projected_bytes` is the size of the compact document the in-page
+    projection sends over the Playwright protocol instead of the full body.
+    """
+    bodies = []
+    page = 0
+    while True:
+        payload = forum.latest(page)
+        bodies.append(json.dumps(payload).encode('utf-8'))
+        if 'topic_list' not in payload:
+            break
+        page += 1
+    compact = [json.dumps(water.project_topic_list(json.loads(body)), separators=(',', ':')) for body in bodies]
+
+    def measure(decode, inputs) -> Dict[str, float]:
+        tracemalloc.start()
+        peak = 0
+        started = time.perf_counter()
+        for raw in inputs:
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            decode(raw)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+        elapsed = time.perf_counter() - started
+        tracemalloc.stop()
+        return {'ms_per_page': elapsed * 1_000 / len(inputs), 'peak_alloc_bytes': peak}
+
+    return {
+        'pages': len(bodies),
+        'decoder': water.JSON_DECODER,
+        'full_bytes': sum(len(body) for body in bodies),
+        'projected_bytes': sum(len(text.encode('utf-8')) for text in compact),
+        'stdlib_full': measure(json.loads, bodies),
+        'request_transport': measure(lambda raw: water.decode_topic_payload(raw, False), bodies),
+        'page_projected': measure(lambda raw: water.decode_topic_payload(raw, True), compact),
+    }
+
+
+def bench_upserts(water, rows: int, batch: int) -> Dict[str, float]:
+    """Push `rows` synthetic upserts through add_or_update_ids_in_db and time the commit."""
+    water.topic_writer.start()
+    started = time.perf_counter()
+    for offset in range(0, rows, batch):
+        water.add_or_update_ids_in_db([(10_000_000 + i, i % 97 + 1) for i in range(offset, min(rows, offset + batch))])
+    water.topic_writer.stop()
+    elapsed = time.perf_counter() - started
+    return {'rows': rows, 'seconds': elapsed, 'upserts_per_second': rows / elapsed if elapsed else 0.0}
+
+
+def bench_browser(water, tpread, args) -> Dict[str, object]:
+    """Drive enumerator_run, benchmark_transports, monitor_pages and visit_topic through a real browser."""
+    from camoufox import Camoufox
+
+    results: Dict[str, object] = {}
+    with Camoufox(from_options=water.build_camoufox_options(), debug=water.CAMOUFOX_DEBUG) as browser:
+        context = browser.new_context(ignore_https_errors=True)
+        context.set_default_timeout(water.NAVIGATION_TIMEOUT)
+        page = context.new_page()
+
+        water.topic_index.load(water.DB_PATH)
+        water.topic_writer.start()
+        started = time.perf_counter()
+        completed = water.enumerator_run(page, 0)
+        elapsed = time.perf_counter() - started
+        pages = water.PAGES_PROCESSED.value(worker=threading.current_thread().name)
+        results['enumerator'] = {
+            'completed': completed,
+            'pages': pages,
+            'seconds': elapsed,
+            'pages_per_second': pages / elapsed if elapsed else 0.0,
+            'transports': water.transport_stats.summary(),
+        }
+        results['transport_comparison'] = water.benchmark_transports(
+            page, water.latest_url(0), args.transport_rounds)
+
+        # Sync Playwright objects only work on the thread that created them, so
+        # the monitor runs here and a timer ends it.
+        worker = threading.current_thread().name
+        pages_before = water.PAGES_PROCESSED.value(worker=worker)
+        changed_before = water.TOPICS_CHANGED.value()
+        timer = threading.Timer(args.monitor_seconds, water.stop_event.set)
+        timer.start()
+        water.monitor_pages(page)
+        timer.cancel()
+        water.stop_event.clear()
+        water.topic_writer.stop()
+        results['monitor'] = {
+            'seconds': args.monitor_seconds,
+            'pages': water.PAGES_PROCESSED.value(worker=worker) - pages_before,
+            'changed_topics': water.TOPICS_CHANGED.value() - changed_before,
+            'cache_hits': water.CACHE_LOOKUPS.value(result='hit'),
+            'cache_misses': water.CACHE_LOOKUPS.value(result='miss'),
+        }
+        page.close()
+        context.close()
+
+        reader_context = browser.new_context(ignore_https_errors=True)
+        reader_context.set_default_timeout(tpread.NAVIGATION_TIMEOUT)
+        tpread.route_filter.install(reader_context)
+        reader_context.add_init_script(tpread.POST_TRACKER_SCRIPT)
+        reader_page = reader_context.new_page()
+        tpread.init_visited_db()
+        checkpointer = tpread.ProgressCheckpointer('visited_posts.db')
+        started = time.perf_counter()
+        for topic_id in range(1, args.visit_topics + 1):
+            tpread.visit_topic(reader_page, checkpointer, topic_id, args.visit_posts, 1)
+        elapsed = time.perf_counter() - started
+        checkpointer.close()
+        steps = tpread.STEP_SECONDS.count()
+        results['reader'] = {
+            'topics': args.visit_topics,
+            'seconds': elapsed,
+            'steps': steps,
+            'step_ms': elapsed * 1_000 / steps if steps else 0.0,
+            'posts_per_second': tpread.POSTS_READ.value() / elapsed if elapsed else 0.0,
+        }
+        reader_page.close()
+        reader_context.close()
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--topics', type=int, default=600, help='synthetic topics in latest.json')
+    parser.add_argument('--page-size', type=int, default=30, help='topics per latest.json page')
+    parser.add_argument('--max-posts', type=int, default=200, help='upper bound for synthetic posts_count')
+    parser.add_argument('--churn', type=int, default=2, help='topics bumped per page-0 request')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='artificial server latency per request')
+    parser.add_argument('--post-bytes', type=int, default=800, help='body size of each synthetic post')
+    parser.add_argument('--posts-per-page', type=int, default=20, help='posts rendered per topic page')
+    parser.add_argument('--upsert-rows', type=int, default=50_000, help='rows for the raw upsert benchmark')
+    parser.add_argument('--monitor-seconds', type=float, default=10.0, help='how long to run monitor_pages')
+    parser.add_argument('--transport-rounds', type=int, default=10,
+                        help='fetches per transport when comparing request API and page navigation')
+    parser.add_argument('--visit-topics', type=int, default=5, help='topics to read with visit_topic')
+    parser.add_argument('--visit-posts', type=int, default=60, help='posts_count used for each visited topic')
+    parser.add_argument('--requests-per-second', type=float, default=0.0,
+                        help='request budget for crawler and reader (0 = unthrottled)')
+    parser.add_argument('--window', type=int, default=3, help='enumerator pages fetched in flight')
+    parser.add_argument('--no-browser', action='store_true', help='skip the browser-driven stages')
+    parser.add_argument('--verbose', action='store_true', help='show the crawler and reader log lines')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args(argv)
+    if args.output:
+        args.output = os.path.abspath(args.output)
+
+    forum = StandInForum(args.topics, args.page_size, args.max_posts, args.churn)
+    handler = make_handler(forum, args.latency_ms / 1_000, args.post_bytes, args.posts_per_page)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, name="StandInServer", daemon=True).start()
+    os.environ['LINUX_DO_BASE_URL'] = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ['WATER_REQUESTS_PER_SECOND'] = os.environ['TPREAD_REQUESTS_PER_SECOND'] = str(args.requests_per_second)
+    os.environ['WATER_ENUMERATOR_WINDOW'] = str(args.window)
+
+    workdir = tempfile.mkdtemp(prefix='linuxdo-bench-')
+    os.chdir(workdir)
+    log_sink = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with log_sink:
+        import tpread
+        import water
+
+        water.init_db()
+        report: Dict[str, object] = {
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'params': vars(args),
+            'decode': bench_decode(water, forum),
+            'handle_topics': bench_handle_topics(water, forum),
+            'upserts': bench_upserts(water, args.upsert_rows, args.page_size),
+        }
+        if not args.no_browser:
+            report.update(bench_browser(water, tpread, args))
+    server.shutdown()
+    report['peak_rss_kib'] = peak_rss_kib()
+    report['workdir'] = workdir
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            handle.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
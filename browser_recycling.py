@@ -0,0 +1,213 @@
+"""Rotate a worker's browser context before Firefox memory growth slows it down.
+
+A `Recycler` owns one thread's working page. `checkpoint(page)` (a no-op
+for threads without a recycler) counts toward two limits: page loads on
+the context (main-frame navigations, plus request-API and in-page fetches
+that callers report through `count_fetches`) and the RSS of this process's browser subprocess
+tree (shared by every browser the process runs, so an RSS rotation in one
+thread holds off the others for a check interval). At `PREPARE_FRACTION`
+of either limit a spare logged-in context and
+page are opened; at the limit the worker swaps to them and the old
+context is closed. If RSS is still over the limit right after a swap the
+growth is in the browser process itself, and `BrowserRestartRequested` is
+raised so the caller relaunches the browser.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+import metrics
+
+PREPARE_FRACTION = 0.9
+
+RECYCLES = metrics.counter('browser_recycles_total', 'Context rotations, by worker and reason.')
+SPARES = metrics.counter('browser_spares_prepared_total', 'Spare logged-in contexts opened ahead of a rotation, by worker.')
+RSS_BYTES = metrics.gauge('browser_rss_bytes', 'RSS of the browser subprocess tree at the last check.')
+NAVIGATIONS = metrics.gauge('browser_context_navigations', 'Navigations and reported fetches on the current context, by worker.')
+
+_local = threading.local()
+_rss_rotation = {'at': 0.0}  # RSS is process-wide, so one rotation answers it for every worker
+
+
+class BrowserRestartRequested(Exception):
+    """Raised by `checkpoint` when rotating contexts no longer brings RSS under the limit."""
+
+
+def browser_rss_bytes(root_pid: Optional[int] = None) -> int:
+    """Summed RSS of all descendants of `root_pid` (this process); 0 where /proc is unavailable."""
+    root = root_pid or os.getpid()
+    children: Dict[int, List[int]] = defaultdict(list)
+    rss: Dict[int, int] = {}
+    try:
+        entries = os.listdir('/proc')
+        page_size = os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r', encoding='utf-8', errors='replace') as handle:
+                fields = handle.read().rsplit(')', 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        pid = int(entry)
+        children[int(fields[1])].append(pid)
+        rss[pid] = int(fields[21]) * page_size
+    total = 0
+    pending = list(children.get(root, ()))
+    while pending:
+        pid = pending.pop()
+        total += rss.get(pid, 0)
+        pending.extend(children.get(pid, ()))
+    return total
+
+
+class Recycler:
+    """Owns the working page of one thread and rotates its context at the configured limits."""
+
+    def __init__(
+        self,
+        context,
+        open_context: Callable[[], object],
+        page_timeout: float,
+        max_navigations: int,
+        max_rss_mb: float,
+        check_seconds: float = 30.0,
+    ) -> None:
+        self.name = threading.current_thread().name
+        self.open_context = open_context
+        self.page_timeout = page_timeout
+        self.max_navigations = max_navigations
+        self.max_rss = max_rss_mb * 1024 * 1024
+        self.check_seconds = check_seconds
+        self.context = context
+        self.page = self._new_page(context)
+        self.navigations = 0
+        self.rss = 0
+        self._next_check = 0.0
+        self._spare = None
+
+    def _new_page(self, context):
+        page = context.new_page()
+        page.set_default_timeout(self.page_timeout)
+        page.on('framenavigated', self._on_navigated)
+        return page
+
+    def _on_navigated(self, frame) -> None:
+        if frame.parent_frame is None:
+            self.navigations += 1
+
+    def _sample_rss(self, force: bool = False) -> int:
+        now = time.monotonic()
+        if force or now >= self._next_check:
+            self._next_check = now + self.check_seconds
+            self.rss = browser_rss_bytes()
+            RSS_BYTES.set(self.rss)
+        return self.rss
+
+    def _pressure(self) -> Dict[str, float]:
+        """Fraction of each configured limit used so far."""
+        pressure: Dict[str, float] = {}
+        if self.max_navigations:
+            pressure['navigations'] = self.navigations / self.max_navigations
+        if self.max_rss and time.monotonic() - _rss_rotation['at'] >= self.check_seconds:
+            pressure['rss'] = self._sample_rss() / self.max_rss
+        return pressure
+
+    def prepare_spare(self) -> None:
+        if self._spare is not None:
+            return
+        started = time.perf_counter()
+        context = self.open_context()
+        self._spare = (context, self._new_page(context))
+        SPARES.inc(worker=self.name)
+        print(f"Thread {self.name}: Spare browser context ready in {time.perf_counter() - started:.1f}s.")
+
+    def checkpoint(self, page):
+        """Rotate if a limit was crossed; returns the page the caller should use from now on."""
+        NAVIGATIONS.set(self.navigations, worker=self.name)
+        pressure = self._pressure()
+        if not pressure or max(pressure.values()) < PREPARE_FRACTION:
+            return self.page
+        if max(pressure.values()) < 1:
+            self.prepare_spare()
+            return self.page
+        reason = max(pressure, key=pressure.get)
+        self.rotate(reason)
+        return self.page
+
+    def rotate(self, reason: str) -> None:
+        """Swap to the spare context (opening it now if needed) and close the old one."""
+        self.prepare_spare()
+        rss_before = self._sample_rss(force=True)
+        old_context, navigations = self.context, self.navigations
+        self.context, self.page = self._spare
+        self._spare = None
+        self.navigations = 0
+        try:
+            old_context.close()
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"Thread {self.name}: Closing the old context failed: {exc}")
+        rss_after = self._sample_rss(force=True)
+        if reason == 'rss':
+            _rss_rotation['at'] = time.monotonic()
+        RECYCLES.inc(worker=self.name, reason=reason)
+        metrics.event(
+            'browser_recycled', worker=self.name, reason=reason, navigations=navigations,
+            rss_before=rss_before, rss_after=rss_after,
+        )
+        print(
+            f"Thread {self.name}: Recycled browser context ({reason}) after {navigations} navigations; "
+            f"browser RSS {rss_before / 1048576:.0f} -> {rss_after / 1048576:.0f} MiB."
+        )
+        if reason == 'rss' and self.max_rss and rss_after >= self.max_rss:
+            RECYCLES.inc(worker=self.name, reason='browser_restart')
+            raise BrowserRestartRequested(f"browser RSS {rss_after / 1048576:.0f} MiB still over the limit")
+
+    def close(self) -> None:
+        """Close the spare and the current context (the caller may still close its original one)."""
+        for context in ([self._spare[0]] if self._spare else []) + [self.context]:
+            try:
+                context.close()
+            except Exception:  # pylint: disable=broad-except
+                pass
+        self._spare = None
+
+
+@contextmanager
+def recycled_page(
+    context,
+    open_context: Callable[[], object],
+    page_timeout: float,
+    max_navigations: int,
+    max_rss_mb: float,
+    check_seconds: float = 30.0,
+) -> Iterator[object]:
+    """Yield a page on `context` whose context is rotated through `checkpoint` in this thread."""
+    recycler = Recycler(context, open_context, page_timeout, max_navigations, max_rss_mb, check_seconds)
+    _local.recycler = recycler
+    try:
+        yield recycler.page
+    finally:
+        _local.recycler = None
+        recycler.close()
+
+
+def count_fetches(count: int = 1) -> None:
+    """Count fetches that do not navigate (request API, in-page `fetch`) toward the calling thread's limit."""
+    recycler: Optional[Recycler] = getattr(_local, 'recycler', None)
+    if recycler is not None:
+        recycler.navigations += count
+
+
+def checkpoint(page):
+    """Rotate the calling thread's context if due; returns the page to keep using."""
+    recycler: Optional[Recycler] = getattr(_local, 'recycler', None)
+    return recycler.checkpoint(page) if recycler is not None else page
@@ -0,0 +1,169 @@
+"""Async counterparts of camoufox_helpers for the single-process asyncio engine."""
+
+import os
+import re
+import time
+from typing import Optional
+
+from playwright.async_api import (
+    Browser,
+    BrowserContext,
+    Error as PlaywrightError,
+    Frame,
+    Page,
+    TimeoutError as PlaywrightTimeoutError,
+)
+
+from camoufox_helpers import (
+    CHALLENGE_SECONDS,
+    LOGINS,
+    DEFAULT_BASE_URL,
+    TURNSTILE_FRAME_SUBSTRING,
+    login_success_pattern,
+    login_url,
+    session_check_url,
+    write_session_file,
+)
+
+
+async def solve_turnstile(page: Page, attempts: int = 10, delay: float = 0.8) -> bool:
+    """Best-effort Cloudflare Turnstile solver using Playwright primitives."""
+    started = time.perf_counter()
+    solved = await _solve_turnstile(page, attempts, delay)
+    CHALLENGE_SECONDS.observe(time.perf_counter() - started, outcome='solved' if solved else 'unsolved')
+    return solved
+
+
+async def _solve_turnstile(page: Page, attempts: int, delay: float) -> bool:
+    try:
+        await page.evaluate("() => { try { turnstile.reset(); } catch (e) {} }")
+    except PlaywrightError:
+        pass
+
+    for _ in range(attempts):
+        try:
+            token = await page.evaluate(
+                "() => { try { return turnstile.getResponse(); } catch (e) { return null; } }"
+            )
+            if token:
+                return True
+        except PlaywrightError:
+            pass
+
+        frame = _locate_turnstile_frame(page)
+        if frame:
+            try:
+                checkbox = frame.locator("input[type='checkbox'], input[type='radio']")
+                await checkbox.wait_for(state="visible", timeout=3_000)
+                await checkbox.click()
+            except PlaywrightTimeoutError:
+                pass
+            except PlaywrightError:
+                pass
+
+        await page.wait_for_timeout(int(delay * 1_000))
+
+    try:
+        await page.reload(wait_until="domcontentloaded")
+    except PlaywrightError:
+        pass
+    return False
+
+
+async def perform_login(
+    context: BrowserContext,
+    username: str,
+    password: str,
+    *,
+    url: str = login_url(),
+    success_pattern: re.Pattern[str] = login_success_pattern(),
+    ready_selector: Optional[str] = "#current-user",
+) -> bool:
+    """Log into linux.do using the provided browser context.
+
+    Success is confirmed by `ready_selector` (the header's user menu) rather
+    than `networkidle`, which Discourse's long-polling keeps from settling;
+    pass None to wait for `networkidle` instead.
+    """
+    page = await context.new_page()
+    page.set_default_timeout(15_000)
+    try:
+        await page.goto(url, wait_until="domcontentloaded")
+        await page.wait_for_selector("#login-account-name", state="visible")
+        await page.wait_for_selector("#login-account-password", state="visible")
+        await solve_turnstile(page)
+        await page.fill("#login-account-name", username)
+        await page.fill("#login-account-password", password)
+        await page.click("#login-button")
+        await page.wait_for_url(success_pattern)
+        if ready_selector:
+            await page.wait_for_selector(ready_selector, state="attached")
+        else:
+            await page.wait_for_load_state("networkidle")
+        return True
+    except PlaywrightTimeoutError as exc:
+        print(f"Login timed out: {exc}")
+    except PlaywrightError as exc:
+        print(f"Login failed: {exc}")
+    finally:
+        await page.close()
+    return False
+
+
+async def session_is_valid(context: BrowserContext, check_url: str = session_check_url(), timeout: float = 15_000) -> bool:
+    """Check with one request whether the context is still logged in."""
+    try:
+        response = await context.request.get(check_url, headers={"Accept": "application/json"}, timeout=timeout)
+        return response.ok and "current_user" in await response.text()
+    except PlaywrightError as exc:
+        print(f"Session check failed: {exc}")
+        return False
+
+
+async def open_logged_in_context(
+    browser: Browser,
+    username: str,
+    password: str,
+    state_path: str,
+    *,
+    timeout: float = 15_000,
+    base_url: str = DEFAULT_BASE_URL,
+    **context_kwargs,
+) -> BrowserContext:
+    """Return a logged-in context, reusing saved session state when it still works."""
+    if os.path.exists(state_path):
+        try:
+            context = await browser.new_context(storage_state=state_path, **context_kwargs)
+        except (PlaywrightError, ValueError) as exc:
+            print(f"Ignoring unreadable session state {state_path}: {exc}")
+        else:
+            context.set_default_timeout(timeout)
+            if await session_is_valid(context, session_check_url(base_url), timeout=timeout):
+                print(f"Reused saved session from {state_path}.")
+                LOGINS.inc(method='session', outcome='ok')
+                return context
+            LOGINS.inc(method='session', outcome='expired')
+            print("Saved session is no longer valid; logging in again.")
+            await context.close()
+
+    context = await browser.new_context(**context_kwargs)
+    context.set_default_timeout(timeout)
+    if not await perform_login(context, username, password, url=login_url(base_url),
+                               success_pattern=login_success_pattern(base_url)):
+        LOGINS.inc(method='form', outcome='failed')
+        await context.close()
+        raise RuntimeError("Login failed. Verify credentials or challenge response.")
+    LOGINS.inc(method='form', outcome='ok')
+    try:
+        write_session_file(await context.storage_state(), state_path)
+    except OSError as exc:
+        print(f"Could not save session state to {state_path}: {exc}")
+    return context
+
+
+def _locate_turnstile_frame(page: Page) -> Optional[Frame]:
+    """Find the Cloudflare Turnstile frame, if present."""
+    for frame in page.frames:
+        if TURNSTILE_FRAME_SUBSTRING in frame.url:
+            return frame
+    return None
@@ -1,20 +1,48 @@
+import json
+import os
 import re
+import tempfile
 import time
 from typing import Optional
 
 from playwright.sync_api import (
+    Browser,
     BrowserContext,
     Error as PlaywrightError,
     Page,
     TimeoutError as PlaywrightTimeoutError,
 )
 
+import metrics
 
 TURNSTILE_FRAME_SUBSTRING = "challenges.cloudflare.com"
+DEFAULT_BASE_URL = "https://linux.do"
+
+CHALLENGE_SECONDS = metrics.histogram('browser_challenge_seconds', 'Time spent in solve_turnstile, by outcome.')
+LOGINS = metrics.counter('browser_logins_total', 'Login attempts by method (saved session or form) and outcome.')
+
+
+def session_check_url(base_url: str = DEFAULT_BASE_URL) -> str:
+    return f"{base_url.rstrip('/')}/session/current.json"
+
+
+def login_url(base_url: str = DEFAULT_BASE_URL) -> str:
+    return f"{base_url.rstrip('/')}/login"
+
+
+def login_success_pattern(base_url: str = DEFAULT_BASE_URL) -> re.Pattern[str]:
+    return re.compile(f"^{re.escape(base_url.rstrip('/'))}/?")
 
 
 def solve_turnstile(page: Page, attempts: int = 10, delay: float = 0.8) -> bool:
     """Best-effort Cloudflare Turnstile solver using Playwright primitives."""
+    started = time.perf_counter()
+    solved = _solve_turnstile(page, attempts, delay)
+    CHALLENGE_SECONDS.observe(time.perf_counter() - started, outcome='solved' if solved else 'unsolved')
+    return solved
+
+
+def _solve_turnstile(page: Page, attempts: int, delay: float) -> bool:
     try:
         page.evaluate("() => { try { turnstile.reset(); } catch (e) {} }")
     except PlaywrightError:
@@ -55,21 +83,30 @@ def perform_login(
     username: str,
     password: str,
     *,
-    login_url: str = "https://linux.do/login",
-    success_pattern: re.Pattern[str] = re.compile(r"^https://linux\.do/?"),
+    url: str = login_url(),
+    success_pattern: re.Pattern[str] = login_success_pattern(),
+    ready_selector: Optional[str] = "#current-user",
 ) -> bool:
-    """Log into linux.do using the provided browser context."""
+    """Log into linux.do using the provided browser context.
+
+    Success is confirmed by `ready_selector` (the header's user menu) rather
+    than `networkidle`, which Discourse's long-polling keeps from settling;
+    pass None to wait for `networkidle` instead.
+    """
     page = context.new_page()
     page.set_default_timeout(15_000)
     try:
-        page.goto(login_url, wait_until="domcontentloaded")
+        page.goto(url, wait_until="domcontentloaded")
         _wait_for_login_inputs(page)
         solve_turnstile(page)
         page.fill("#login-account-name", username)
         page.fill("#login-account-password", password)
         page.click("#login-button")
         page.wait_for_url(success_pattern)
-        page.wait_for_load_state("networkidle")
+        if ready_selector:
+            page.wait_for_selector(ready_selector, state="attached")
+        else:
+            page.wait_for_load_state("networkidle")
         return True
     except PlaywrightTimeoutError as exc:
         print(f"Login timed out: {exc}")
@@ -80,6 +117,79 @@ def perform_login(
     return False
 
 
+def session_is_valid(context: BrowserContext, check_url: str = session_check_url(), timeout: float = 15_000) -> bool:
+    """Check with one request whether the context is still logged in."""
+    try:
+        response = context.request.get(check_url, headers={"Accept": "application/json"}, timeout=timeout)
+        return response.ok and "current_user" in response.text()
+    except PlaywrightError as exc:
+        print(f"Session check failed: {exc}")
+        return False
+
+
+def save_session_state(context: BrowserContext, state_path: str) -> None:
+    """Atomically write the context's cookies and local storage to `state_path`."""
+    write_session_file(context.storage_state(), state_path)
+
+
+def write_session_file(state: dict, state_path: str) -> None:
+    """Write a storage-state dict via a temp file so readers never see a partial file."""
+    directory, name = os.path.split(os.path.abspath(state_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f"{name}.", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump(state, handle)
+        os.replace(tmp_path, state_path)
+    except OSError:
+        os.unlink(tmp_path)
+        raise
+
+
+def open_logged_in_context(
+    browser: Browser,
+    username: str,
+    password: str,
+    state_path: str,
+    *,
+    timeout: float = 15_000,
+    base_url: str = DEFAULT_BASE_URL,
+    **context_kwargs,
+) -> BrowserContext:
+    """Return a logged-in context, reusing saved session state when it still works.
+
+    A full `perform_login` only runs when there is no saved state or the
+    saved session fails `session_is_valid`; the fresh state is then saved.
+    """
+    if os.path.exists(state_path):
+        try:
+            context = browser.new_context(storage_state=state_path, **context_kwargs)
+        except (PlaywrightError, ValueError) as exc:
+            print(f"Ignoring unreadable session state {state_path}: {exc}")
+        else:
+            context.set_default_timeout(timeout)
+            if session_is_valid(context, session_check_url(base_url), timeout=timeout):
+                print(f"Reused saved session from {state_path}.")
+                LOGINS.inc(method='session', outcome='ok')
+                return context
+            LOGINS.inc(method='session', outcome='expired')
+            print("Saved session is no longer valid; logging in again.")
+            context.close()
+
+    context = browser.new_context(**context_kwargs)
+    context.set_default_timeout(timeout)
+    if not perform_login(context, username, password, url=login_url(base_url),
+                         success_pattern=login_success_pattern(base_url)):
+        LOGINS.inc(method='form', outcome='failed')
+        context.close()
+        raise RuntimeError("Login failed. Verify credentials or challenge response.")
+    LOGINS.inc(method='form', outcome='ok')
+    try:
+        save_session_state(context, state_path)
+    except OSError as exc:
+        print(f"Could not save session state to {state_path}: {exc}")
+    return context
+
+
 def _locate_turnstile_frame(page: Page) -> Optional[Page]:
     """Find the Cloudflare Turnstile frame, if present."""
     for frame in page.frames:
@@ -0,0 +1,200 @@
+"""Record browser responses into a compressed fixture store and replay them offline.
+
+Record mode stores every finished response of a context whose URL matches a
+pattern, plus JSON bodies fetched through the request API (which bypasses
+routing and must call `add` itself), in one SQLite file. Bodies are
+zlib-compressed and de-duplicated by digest, so repeated polls of an
+unchanged page cost one row each.
+
+Replay mode opens a plain context (no login) whose route fulfils each
+request from the store: per method and URL, responses come back in the
+order they were recorded, the last one repeating once they run out, and
+anything never recorded is aborted so the session stays offline. `speed`
+scales the recorded latency: 1.0 replays it as measured, 4.0 four times
+faster, 0 serves immediately. Route handlers run on the page's thread, so
+the delays of concurrent in-page fetches add up rather than overlap.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from playwright.sync_api import Error as PlaywrightError
+
+import metrics
+import schema
+
+COMPRESS_LEVEL = 6
+# Dropped when recording: bodies are stored decoded and re-framed on fulfil.
+HOP_HEADERS = frozenset({'content-encoding', 'content-length', 'transfer-encoding', 'connection'})
+
+FIXTURE_MIGRATIONS = (
+    # 1: responses in recording order, bodies stored once per digest.
+    (
+        '''
+        CREATE TABLE IF NOT EXISTS fixture_bodies (
+            digest BLOB PRIMARY KEY,
+            size INTEGER NOT NULL,
+            data BLOB NOT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS fixture_responses (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            method TEXT NOT NULL,
+            url TEXT NOT NULL,
+            status INTEGER NOT NULL,
+            headers TEXT NOT NULL,
+            digest BLOB NOT NULL,
+            elapsed_ms REAL,
+            recorded_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_fixture_responses_url ON fixture_responses (method, url, seq)',
+    ),
+)
+
+RESPONSES = metrics.counter('fixture_responses_total', 'Fixture store traffic by result (recorded, served, missed).')
+BODY_BYTES = metrics.counter('fixture_body_bytes_total', 'Uncompressed body bytes recorded or served, by mode.')
+
+_TAKE_SQL = '''
+    SELECT r.status, r.headers, b.data, r.elapsed_ms
+    FROM fixture_responses r JOIN fixture_bodies b ON b.digest = r.digest
+    WHERE r.method = ? AND r.url = ?
+    ORDER BY r.seq
+    LIMIT 1 OFFSET ?
+'''
+
+
+class Fixture(NamedTuple):
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    elapsed_ms: float
+
+
+class FixtureStore:
+    """One fixture file shared by every thread of the process."""
+
+    def __init__(self, path: str, speed: float = 1.0) -> None:
+        schema.migrate(path, FIXTURE_MIGRATIONS)
+        self.path = path
+        self.speed = speed
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._served: Dict[Tuple[str, str], int] = {}
+
+    def add(self, method: str, url: str, status: int, headers: Dict[str, str], body: bytes, elapsed_ms: float) -> None:
+        digest = hashlib.sha1(body).digest()
+        kept = {name: value for name, value in headers.items() if name.lower() not in HOP_HEADERS}
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR IGNORE INTO fixture_bodies (digest, size, data) VALUES (?, ?, ?)',
+                (digest, len(body), zlib.compress(body, COMPRESS_LEVEL)),
+            )
+            self._conn.execute(
+                'INSERT INTO fixture_responses (method, url, status, headers, digest, elapsed_ms) VALUES (?, ?, ?, ?, ?, ?)',
+                (method, url, status, json.dumps(kept), digest, elapsed_ms),
+            )
+        RESPONSES.inc(result='recorded')
+        BODY_BYTES.inc(len(body), mode='record')
+
+    def take(self, method: str, url: str) -> Optional[Fixture]:
+        """The next recorded response for `method url`, or None if it was never recorded."""
+        key = (method, url)
+        with self._lock:
+            offset = self._served.get(key, 0)
+            row = self._conn.execute(_TAKE_SQL, (method, url, offset)).fetchone()
+            if row is not None:
+                self._served[key] = offset + 1
+            elif offset:
+                row = self._conn.execute(_TAKE_SQL, (method, url, offset - 1)).fetchone()
+        if row is None:
+            RESPONSES.inc(result='missed')
+            return None
+        status, headers, data, elapsed_ms = row
+        body = zlib.decompress(data)
+        RESPONSES.inc(result='served')
+        BODY_BYTES.inc(len(body), mode='replay')
+        return Fixture(status, json.loads(headers), body, elapsed_ms or 0.0)
+
+    def serve(self, method: str, url: str) -> Optional[Fixture]:
+        """`take`, then wait out the recorded latency scaled by `speed`."""
+        fixture = self.take(method, url)
+        if fixture is not None and self.speed > 0:
+            time.sleep(fixture.elapsed_ms / 1000 / self.speed)
+        return fixture
+
+    def summary(self) -> str:
+        with self._lock:
+            responses, urls = self._conn.execute('SELECT COUNT(*), COUNT(DISTINCT url) FROM fixture_responses').fetchone()
+            bodies, raw, stored = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(data)), 0) FROM fixture_bodies'
+            ).fetchone()
+        return (
+            f"{responses} responses for {urls} URLs, {bodies} distinct bodies, "
+            f"{raw / 1048576:.1f} MiB stored in {stored / 1048576:.1f} MiB"
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def record_context(store: FixtureStore, context, url_pattern: str = '.') -> None:
+    """Store every finished response of `context` whose URL matches `url_pattern`."""
+    pattern = re.compile(url_pattern)
+
+    def _on_finished(request) -> None:
+        if not pattern.search(request.url):
+            return
+        try:
+            response = request.response()
+            if response is None:
+                return
+            try:
+                body = response.body()
+            except PlaywrightError:  # redirects and other bodiless responses
+                body = b''
+            elapsed_ms = max(0.0, request.timing.get('responseEnd', 0.0))
+            store.add(request.method, request.url, response.status, response.headers, body, elapsed_ms)
+        except PlaywrightError as exc:
+            print(f"Fixture store: could not record {request.url}: {exc}")
+
+    context.on('requestfinished', _on_finished)
+
+
+def install_replay(store: FixtureStore, context) -> None:
+    """Fulfil every request of `context` from `store`, aborting the ones it does not have.
+
+    Register this before any other route so those run first and can
+    `fallback()` into it.
+    """
+
+    def _fulfil(route) -> None:
+        request = route.request
+        try:
+            fixture = store.serve(request.method, request.url)
+            if fixture is None:
+                route.abort('internetdisconnected')
+                return
+            route.fulfill(status=fixture.status, headers=fixture.headers, body=fixture.body)
+        except PlaywrightError:
+            pass
+
+    context.route('**/*', _fulfil)
+
+
+def open_replay_context(browser, store: FixtureStore, timeout: float = 15_000, **context_kwargs):
+    """A fresh, offline context served from `store`; no login is needed."""
+    context = browser.new_context(**context_kwargs)
+    context.set_default_timeout(timeout)
+    install_replay(store, context)
+    return context
@@ -0,0 +1,56 @@
+"""Liveness heartbeat read by start.py.
+
+Worker loops call `beat()`, which records the calling thread's time and, at
+most every `WRITE_SECONDS`, writes the oldest beat among the threads that
+have beaten to `HEARTBEAT_FILE` (set by start.py; without it this module
+does nothing). A thread stuck in a browser call stops beating, so the file
+ages even while other threads keep running. Both crawler and reader threads
+run until their process exits, so threads never leave the set.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+HEARTBEAT_FILE = os.getenv('HEARTBEAT_FILE')
+WRITE_SECONDS = float(os.getenv('HEARTBEAT_WRITE_SECONDS', '5'))
+
+_lock = threading.Lock()
+_beats: Dict[str, float] = {}
+_written = 0.0
+
+
+def _write(now: float) -> None:
+    global _written  # pylint: disable=global-statement
+    oldest = min(_beats.values(), default=now)
+    tmp_path = f"{HEARTBEAT_FILE}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            handle.write(f"{oldest:.3f}\n")
+        os.replace(tmp_path, HEARTBEAT_FILE)
+    except OSError as exc:
+        print(f"Heartbeat: could not write {HEARTBEAT_FILE}: {exc}")
+    _written = now
+
+
+def beat() -> None:
+    """Record that the calling thread is making progress."""
+    if not HEARTBEAT_FILE:
+        return
+    now = time.time()
+    with _lock:
+        _beats[threading.current_thread().name] = now
+        if now - _written >= WRITE_SECONDS:
+            _write(now)
+
+
+def read(path: str) -> Optional[float]:
+    """The heartbeat time stored in `path`, or None if it was not written yet."""
+    try:
+        with open(path, 'r', encoding='utf-8') as handle:
+            return float(handle.read().strip())
+    except (OSError, ValueError):
+        return None
@@ -0,0 +1,253 @@
+"""Shared in-process metrics for the crawler and the reader.
+
+Counters, gauges and latency histograms live in one module-level registry and
+can be exported as Prometheus text (to a file rewritten periodically or over a
+local HTTP endpoint), with an optional JSONL event log alongside.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS: Sequence[float] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+EXPORT_INTERVAL_SECONDS = float(os.getenv('METRICS_EXPORT_INTERVAL_SECONDS', '15'))
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    body = ','.join(f'{name}="{value}"' for name, value in pairs)
+    return '{' + body + '}'
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, help_text: str) -> None:
+        self.name = name
+        self.help_text = help_text
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic total, optionally split by labels."""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str) -> None:
+        super().__init__(name, help_text)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels: object) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: object) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            lines.extend(f"{self.name}{_format_labels(key)} {value}" for key, value in sorted(self._values.items()))
+        return lines
+
+
+class Gauge(_Metric):
+    """Last observed value, optionally split by labels."""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, help_text: str) -> None:
+        super().__init__(name, help_text)
+        self._values: Dict[LabelKey, float] = {}
+
+    def set(self, value: float, **labels: object) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def value(self, **labels: object) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            lines.extend(f"{self.name}{_format_labels(key)} {value}" for key, value in sorted(self._values.items()))
+        return lines
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket latency histogram in seconds."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, help_text)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: object) -> Iterator[None]:
+        """Observe the wall time of the `with` block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: object) -> float:
+        with self._lock:
+            series = self._series.get(_label_key(labels))
+            return series[-1] if series else 0
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0.0
+                for bound, hits in zip(self.buckets, series):
+                    cumulative += hits
+                    lines.append(f"{self.name}_bucket{_format_labels(key, ('le', str(bound)))} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    """Named metrics plus the optional JSONL event sink."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+        self._event_file = None
+
+    def _get_or_create(self, cls, name: str, help_text: str, **kwargs) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {metric.kind}.")
+            return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._get_or_create(Counter, name, help_text)
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text)
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, buckets=buckets)
+
+    def render(self) -> str:
+        """Prometheus text exposition of every registered metric."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def open_event_log(self, path: str) -> None:
+        with self._lock:
+            self._event_file = open(path, 'a', encoding='utf-8', buffering=1)
+
+    def event(self, kind: str, **fields: object) -> None:
+        """Append one JSON line to the event log, if one is open."""
+        if self._event_file is None:
+            return
+        record = {'ts': time.time(), 'event': kind, **fields}
+        line = json.dumps(record, default=str)
+        with self._lock:
+            if self._event_file is not None:
+                self._event_file.write(line + '\n')
+
+
+registry = Registry()
+counter = registry.counter
+gauge = registry.gauge
+histogram = registry.histogram
+event = registry.event
+
+
+def write_prometheus_file(path: str) -> None:
+    """Atomically replace `path` with the current exposition text."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as handle:
+        handle.write(registry.render())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:  # noqa: N802 (http.server naming)
+        if self.path not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:  # pylint: disable=redefined-builtin
+        pass
+
+
+def start_exporters(
+    prom_file: Optional[str] = None,
+    http_port: Optional[int] = None,
+    event_log: Optional[str] = None,
+    interval: float = EXPORT_INTERVAL_SECONDS,
+) -> None:
+    """Start whichever exporters are configured; all are off by default."""
+    if event_log:
+        registry.open_event_log(event_log)
+        print(f"Metrics: appending events to {event_log}.")
+    if prom_file:
+        def _write_loop() -> None:
+            while True:
+                try:
+                    write_prometheus_file(prom_file)
+                except OSError as exc:
+                    print(f"Metrics: could not write {prom_file}: {exc}")
+                time.sleep(interval)
+
+        threading.Thread(target=_write_loop, name="MetricsFileWriter", daemon=True).start()
+        print(f"Metrics: writing Prometheus text to {prom_file} every {interval:.0f}s.")
+    if http_port:
+        server = ThreadingHTTPServer(('127.0.0.1', http_port), _MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="MetricsHTTP", daemon=True).start()
+        print(f"Metrics: serving http://127.0.0.1:{http_port}/metrics.")
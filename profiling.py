@@ -0,0 +1,198 @@
+"""Opt-in live profiling for the crawler and the reader.
+
+Once `install` has run, a process can be inspected without a restart:
+
+    kill -USR1 <pid>    dump thread stacks, then sample all threads for N seconds
+    kill -USR2 <pid>    record a Playwright trace of each active page for N seconds
+
+or, with a control socket configured, one command per connection:
+
+    echo "profile 60" | socat - UNIX-CONNECT:/tmp/water.sock   (also: stacks, trace [seconds])
+
+Output goes to timestamped files in the configured directory: `.stacks.txt`
+dumps, `.folded` sample profiles (flamegraph.pl / speedscope input) and
+Playwright `.trace.zip` archives. Playwright objects may only be used from
+the thread that owns them, so tracing is only requested here; page owners
+call `trace_checkpoint` from their loops to start and stop it.
+"""
+
+from __future__ import annotations
+
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL_SECONDS', '0.005'))
+HELPER_THREADS = frozenset({"SamplingProfiler", "ProfilingControl", "ProfilingSignal"})
+
+
+class Profiler:
+    """Stack dumps, a sampling profiler and trace requests for one process."""
+
+    def __init__(self, prefix: str, output_dir: str, default_seconds: float) -> None:
+        self.prefix = prefix
+        self.output_dir = output_dir
+        self.default_seconds = max(1.0, default_seconds)
+        self._sampling = threading.Lock()
+        self._trace_lock = threading.Lock()
+        self._trace_until = 0.0
+        self._tracing: Dict[str, float] = {}
+
+    def path(self, kind: str, suffix: str = '') -> str:
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        name = f"{self.prefix}-{stamp}-{kind}{suffix}".replace(os.sep, '_')
+        return os.path.join(self.output_dir, name)
+
+    def dump_stacks(self) -> str:
+        """Write the current stack of every thread; returns the file path."""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        path = self.path('stacks', '.txt')
+        with open(path, 'w', encoding='utf-8') as handle:
+            for ident, frame in sys._current_frames().items():  # pylint: disable=protected-access
+                handle.write(f"--- Thread {names.get(ident, ident)} ({ident}) ---\n")
+                handle.write(''.join(traceback.format_stack(frame)))
+                handle.write('\n')
+        print(f"Profiling: wrote thread stacks to {path}.")
+        return path
+
+    def start_profile(self, seconds: Optional[float] = None) -> Optional[str]:
+        """Sample all threads for `seconds` in the background; None if a profile is already running."""
+        if not self._sampling.acquire(blocking=False):
+            print("Profiling: a sampling profile is already running.")
+            return None
+        seconds = seconds or self.default_seconds
+        path = self.path('profile', '.folded')
+        threading.Thread(target=self._sample, args=(seconds, path), name="SamplingProfiler", daemon=True).start()
+        print(f"Profiling: sampling all threads for {seconds:.0f}s into {path}.")
+        return path
+
+    def _sample(self, seconds: float, path: str) -> None:
+        try:
+            stacks: Counter = Counter()
+            leaves: Counter = Counter()
+            samples = 0
+            end = time.monotonic() + seconds
+            while time.monotonic() < end:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():  # pylint: disable=protected-access
+                    if names.get(ident) in HELPER_THREADS:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                        frame = frame.f_back
+                    stacks[(names.get(ident, str(ident)),) + tuple(reversed(stack))] += 1
+                    if stack:
+                        leaves[stack[0]] += 1
+                samples += 1
+                time.sleep(SAMPLE_INTERVAL)
+            with open(path, 'w', encoding='utf-8') as handle:
+                for stack, count in stacks.most_common():
+                    handle.write(f"{';'.join(stack)} {count}\n")
+            top = ', '.join(f"{name} x{count}" for name, count in leaves.most_common(5))
+            print(f"Profiling: {samples} samples written to {path}; hottest frames: {top}.")
+        except OSError as exc:
+            print(f"Profiling: could not write {path}: {exc}")
+        finally:
+            self._sampling.release()
+
+    def request_trace(self, seconds: Optional[float] = None) -> None:
+        """Ask every page owner calling `trace_action` to trace for `seconds`."""
+        seconds = seconds or self.default_seconds
+        with self._trace_lock:
+            self._trace_until = time.monotonic() + seconds
+        print(f"Profiling: Playwright tracing requested for {seconds:.0f}s.")
+
+    def trace_action(self, owner: str) -> Tuple[Optional[str], Optional[str]]:
+        """`('start', None)`, `('stop', path)` or `(None, None)` for the tracing owner `owner`."""
+        now = time.monotonic()
+        with self._trace_lock:
+            if owner not in self._tracing and now < self._trace_until:
+                self._tracing[owner] = now
+                return 'start', None
+            if owner in self._tracing and now >= self._trace_until:
+                del self._tracing[owner]
+                return 'stop', self.path(f'{owner}-trace', '.zip')
+        return None, None
+
+
+profiler: Optional[Profiler] = None
+
+
+def _serve_control(path: str) -> None:
+    if os.path.exists(path):
+        os.unlink(path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    os.chmod(path, 0o600)
+    server.listen(1)
+    while True:
+        conn, _ = server.accept()
+        with conn:
+            try:
+                command, *args = (conn.recv(256).decode('utf-8', errors='replace').split() or ['help'])
+                seconds = float(args[0]) if args else None
+                if command == 'stacks':
+                    reply = profiler.dump_stacks()
+                elif command == 'profile':
+                    reply = profiler.start_profile(seconds) or 'busy'
+                elif command == 'trace':
+                    profiler.request_trace(seconds)
+                    reply = 'ok'
+                else:
+                    reply = 'commands: stacks | profile [seconds] | trace [seconds]'
+            except (OSError, ValueError) as exc:
+                reply = f'error: {exc}'
+            conn.sendall((reply + '\n').encode('utf-8'))
+
+
+def install(prefix: str, output_dir: str, default_seconds: float = 30.0, control_socket: Optional[str] = None) -> None:
+    """Create the process profiler and hook SIGUSR1/SIGUSR2 (and the control socket, if given).
+
+    Must run on the main thread.
+    """
+    global profiler  # pylint: disable=global-statement
+    os.makedirs(output_dir, exist_ok=True)
+    profiler = Profiler(prefix, output_dir, default_seconds)
+
+    def _on_usr1(signum, frame) -> None:
+        threading.Thread(
+            target=lambda: (profiler.dump_stacks(), profiler.start_profile()), name="ProfilingSignal", daemon=True
+        ).start()
+
+    def _on_usr2(signum, frame) -> None:
+        profiler.request_trace()
+
+    signal.signal(signal.SIGUSR1, _on_usr1)
+    signal.signal(signal.SIGUSR2, _on_usr2)
+    if control_socket:
+        threading.Thread(target=_serve_control, args=(control_socket,), name="ProfilingControl", daemon=True).start()
+    print(
+        f"Profiling: hooks installed (pid {os.getpid()}, output {output_dir}"
+        f"{', socket ' + control_socket if control_socket else ''})."
+    )
+
+
+def trace_checkpoint(page, owner: Optional[str] = None) -> None:
+    """Start or stop Playwright tracing on `page`'s context as requested; call from the page's thread."""
+    if profiler is None:
+        return
+    action, path = profiler.trace_action(owner or threading.current_thread().name)
+    if action is None:
+        return
+    try:
+        if action == 'start':
+            page.context.tracing.start(screenshots=True, snapshots=True)
+            print(f"Profiling: tracing started for {owner or threading.current_thread().name}.")
+        else:
+            page.context.tracing.stop(path=path)
+            print(f"Profiling: trace written to {path}.")
+    except Exception as exc:  # pylint: disable=broad-except
+        print(f"Profiling: tracing {action} failed: {exc}")
@@ -0,0 +1,76 @@
+"""Process-wide token bucket that every outgoing fetch acquires from.
+
+Waiters are served strictly by priority (lower number first, FIFO within a
+priority), so a monitor poll never queues behind backfill work. A rate of 0
+disables the budget.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import metrics
+
+PRIORITY_MONITOR = 0
+PRIORITY_READER = 1
+PRIORITY_BACKFILL = 2
+PRIORITY_NAMES = {PRIORITY_MONITOR: 'monitor', PRIORITY_READER: 'reader', PRIORITY_BACKFILL: 'backfill'}
+
+WAIT_SECONDS = metrics.histogram('request_budget_wait_seconds', 'Time spent waiting for a request token, by priority.')
+GRANTED = metrics.counter('request_budget_granted_total', 'Request tokens handed out, by priority.')
+WAITERS = metrics.gauge('request_budget_waiters', 'Fetches currently waiting for a token.')
+
+
+class RequestBudget:
+    """Token bucket refilled at `rate` tokens per second, holding at most `burst`."""
+
+    def __init__(self, rate: float, burst: float = 1.0) -> None:
+        self.rate = max(0.0, rate)
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._refilled = time.monotonic()
+        self._cond = threading.Condition()
+        self._waiters: List[Tuple[int, int]] = []
+        self._seq = itertools.count()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def acquire(self, priority: int = PRIORITY_BACKFILL, stop_event: Optional[threading.Event] = None) -> bool:
+        """Block until a token is available; returns False if `stop_event` is set first."""
+        label = PRIORITY_NAMES.get(priority, str(priority))
+        if not self.rate:
+            GRANTED.inc(priority=label)
+            return True
+        started = time.monotonic()
+        ticket = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            WAITERS.set(len(self._waiters))
+            try:
+                while True:
+                    if stop_event is not None and stop_event.is_set():
+                        return False
+                    self._refill()
+                    if self._waiters[0] == ticket:
+                        if self._tokens >= 1:
+                            self._tokens -= 1
+                            break
+                        timeout = (1 - self._tokens) / self.rate
+                    else:
+                        timeout = 1.0
+                    self._cond.wait(timeout=min(1.0, timeout))
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                WAITERS.set(len(self._waiters))
+                self._cond.notify_all()
+        WAIT_SECONDS.observe(time.monotonic() - started, priority=label)
+        GRANTED.inc(priority=label)
+        return True
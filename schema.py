@@ -0,0 +1,165 @@
+"""Versioned schema migrations for topics.db and visited_posts.db.
+
+Each database records its version in `PRAGMA user_version`. Migrations are
+applied in order, each in its own `BEGIN IMMEDIATE` transaction that re-reads
+the version first, so the crawler and the reader can both call `migrate` on
+the same file without racing.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from typing import Sequence, Tuple
+
+Migration = Tuple[str, ...]
+
+TOPICS_MIGRATIONS: Sequence[Migration] = (
+    # 1: baseline tables (matches databases created before versioning).
+    (
+        '''
+        CREATE TABLE IF NOT EXISTS topic_ids (
+            id INTEGER PRIMARY KEY,
+            posts_count INTEGER,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS topic_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            topic_id INTEGER NOT NULL,
+            posts_count INTEGER,
+            changed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS crawl_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+        ''',
+    ),
+    # 2: topic metadata from latest.json plus indexes for delta queries.
+    (
+        'ALTER TABLE topic_ids ADD COLUMN highest_post_number INTEGER',
+        'ALTER TABLE topic_ids ADD COLUMN bumped_at TEXT',
+        'ALTER TABLE topic_ids ADD COLUMN last_posted_at TEXT',
+        'ALTER TABLE topic_ids ADD COLUMN category_id INTEGER',
+        'CREATE INDEX IF NOT EXISTS idx_topic_ids_bumped_at ON topic_ids (bumped_at)',
+        'CREATE INDEX IF NOT EXISTS idx_topic_ids_timestamp ON topic_ids (timestamp)',
+        'CREATE INDEX IF NOT EXISTS idx_topic_ids_category ON topic_ids (category_id, bumped_at)',
+        'CREATE INDEX IF NOT EXISTS idx_topic_changes_changed_at ON topic_changes (changed_at)',
+    ),
+    # 3: enumeration cycles and per-page outcomes for crash-safe resume.
+    (
+        '''
+        CREATE TABLE IF NOT EXISTS crawl_cycles (
+            cycle_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            incremental INTEGER NOT NULL,
+            start_page INTEGER NOT NULL,
+            last_page INTEGER,
+            newest_seen TEXT,
+            status TEXT NOT NULL DEFAULT 'running',
+            started_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS crawl_pages (
+            cycle_id INTEGER NOT NULL,
+            page INTEGER NOT NULL,
+            outcome TEXT NOT NULL,
+            topics INTEGER,
+            changed INTEGER,
+            fetched_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (cycle_id, page)
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_crawl_cycles_status ON crawl_cycles (status, cycle_id)',
+    ),
+    # 4: posts_count history and its activity rollup (see topic_history.py),
+    # seeded with each topic's last known count.
+    (
+        '''
+        CREATE TABLE IF NOT EXISTS topic_history (
+            topic_id INTEGER NOT NULL,
+            observed_at INTEGER NOT NULL,
+            posts_count INTEGER NOT NULL,
+            PRIMARY KEY (topic_id, observed_at)
+        ) WITHOUT ROWID
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_topic_history_observed_at ON topic_history (observed_at)',
+        '''
+        CREATE TABLE IF NOT EXISTS topic_activity (
+            topic_id INTEGER PRIMARY KEY,
+            posts_per_day REAL NOT NULL,
+            last_observed_at INTEGER,
+            computed_at INTEGER
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_topic_activity_rate ON topic_activity (posts_per_day)',
+        '''
+        INSERT OR IGNORE INTO topic_history (topic_id, observed_at, posts_count)
+        SELECT id, COALESCE(CAST(strftime('%s', timestamp) AS INTEGER), 0), posts_count
+        FROM topic_ids WHERE posts_count IS NOT NULL
+        ''',
+    ),
+)
+
+VISITED_MIGRATIONS: Sequence[Migration] = (
+    # 1: baseline tables.
+    (
+        '''
+        CREATE TABLE IF NOT EXISTS visited_topics (
+            topic_id INTEGER PRIMARY KEY,
+            last_visited_posts_count INTEGER,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS reader_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+        ''',
+    ),
+    # 2: "read since X" lookups.
+    (
+        'CREATE INDEX IF NOT EXISTS idx_visited_topics_timestamp ON visited_topics (timestamp)',
+    ),
+)
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return int(conn.execute('PRAGMA user_version').fetchone()[0])
+
+
+def migrate(db_path: str, migrations: Sequence[Migration]) -> int:
+    """Bring `db_path` up to the latest version in WAL mode; returns the final version."""
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=30)
+    try:
+        conn.execute('PRAGMA journal_mode=WAL')
+        for version, statements in enumerate(migrations, start=1):
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if schema_version(conn) >= version:
+                    conn.execute('COMMIT')
+                    continue
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(f'PRAGMA user_version = {version}')
+                conn.execute('COMMIT')
+            except sqlite3.Error:
+                conn.execute('ROLLBACK')
+                raise
+            print(f"Migrated {db_path} to schema version {version}.")
+        return schema_version(conn)
+    finally:
+        conn.close()
+
+
+def migrate_topics_db(db_path: str = 'topics.db') -> int:
+    return migrate(db_path, TOPICS_MIGRATIONS)
+
+
+def migrate_visited_db(db_path: str = 'visited_posts.db') -> int:
+    return migrate(db_path, VISITED_MIGRATIONS)
@@ -5,15 +5,32 @@ import threading
 import signal
 import sys
 import os
+import logging
+from logging.handlers import RotatingFileHandler
+
+import heartbeat
 
 # --- 配置 ---
-CRAWLER_SCRIPT = "main.py"  # 爬取器主脚本的文件名
+CRAWLER_SCRIPT = "water.py"  # 爬取器主脚本的文件名
 VISITOR_SCRIPT = "tpread.py"  # 水帖器脚本的文件名 (修改这里)
 WAIT_BEFORE_VISITOR = 10  # 启动爬取器后，等待多少秒再启动水帖器
 
 DEFAULT_VENV_PY = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".venv", "bin", "python")
 PYTHON_EXECUTABLE = os.getenv("PROJECT_PYTHON", DEFAULT_VENV_PY if os.path.exists(DEFAULT_VENV_PY) else sys.executable)
 
+# --- 日志与重启策略配置 ---
+LOG_DIR = os.getenv("START_LOG_DIR", "logs")  # 子进程输出的日志目录
+LOG_MAX_BYTES = int(os.getenv("START_LOG_MAX_BYTES", str(10 * 1024 * 1024)))  # 单个日志文件最大字节数
+LOG_BACKUPS = int(os.getenv("START_LOG_BACKUPS", "5"))  # 保留的轮转日志份数
+ECHO_OUTPUT = os.getenv("START_ECHO_OUTPUT", "1") == "1"  # 是否同时把子进程输出打印到控制台
+RESTART_BASE_DELAY = float(os.getenv("START_RESTART_BASE_DELAY", "5"))  # 首次重启等待秒数
+RESTART_MAX_DELAY = float(os.getenv("START_RESTART_MAX_DELAY", "300"))  # 指数退避的上限
+STABLE_SECONDS = float(os.getenv("START_STABLE_SECONDS", "300"))  # 运行超过这么久视为稳定，退避清零
+CRASH_LOOP_LIMIT = int(os.getenv("START_CRASH_LOOP_LIMIT", "5"))  # 时间窗口内允许的最多崩溃次数
+CRASH_LOOP_WINDOW = float(os.getenv("START_CRASH_LOOP_WINDOW", "1800"))  # 崩溃计数的时间窗口（秒）
+LIVENESS_TIMEOUT = float(os.getenv("START_LIVENESS_TIMEOUT", "600"))  # 子进程心跳文件多久未更新视为卡死，0 表示关闭
+STOP_TIMEOUT = float(os.getenv("START_STOP_TIMEOUT", "15"))  # 优雅退出的等待秒数，超时后强制杀死
+
 # --- 用户名和密码配置 ---
 USERNAME = "petyr"  # 在这里配置用户名
 PASSWORD = "your_actual_password_here" # 在这里配置密码，请确保安全性
@@ -26,48 +43,136 @@ def signal_handler(signum, frame):
     print(f"\nReceived signal {signum}, stopping all processes...")
     stop_event.set()
 
+def build_logger(process_name):
+    """为子进程创建一个带轮转的日志记录器"""
+    os.makedirs(LOG_DIR, exist_ok=True)
+    logger = logging.getLogger(f"child.{process_name}")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    if not logger.handlers:
+        handler = RotatingFileHandler(os.path.join(LOG_DIR, f"{process_name}.log"),
+                                      maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8")
+        handler.setFormatter(logging.Formatter(f"%(asctime)s [{process_name}] %(message)s"))
+        logger.addHandler(handler)
+    return logger
+
+def pump_output(proc, process_name, logger):
+    """持续读取子进程输出，避免管道写满导致子进程阻塞"""
+    for line in iter(proc.stdout.readline, ''):
+        line = line.rstrip('\n')
+        logger.info(line)
+        if ECHO_OUTPUT:
+            print(f"[{process_name}] {line}", flush=True)
+    proc.stdout.close()
+
+def stop_process(proc, process_name):
+    """先发送 SIGTERM 优雅退出，超时后强制杀死"""
+    if not proc or proc.poll() is not None:
+        return
+    print(f"Stopping {process_name} process (PID: {proc.pid})...")
+    proc.terminate()
+    try:
+        proc.wait(timeout=STOP_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        print(f"Force killing {process_name} process (PID: {proc.pid})...")
+        proc.kill()
+        proc.wait()
+
+def wait_or_stop(seconds):
+    """等待指定秒数，收到停止信号时立即返回"""
+    return stop_event.wait(seconds)
+
+def heartbeat_path(process_name):
+    return os.path.abspath(os.path.join(LOG_DIR, f"{process_name}.heartbeat"))
+
+def run_once(script_name, process_name, env, logger):
+    """启动一次子进程并监控到其退出，返回退出码（被停止时返回 None）
+
+    存活检查读取子进程工作线程写入的心跳文件（见 heartbeat.py），而不是看输出：
+    空闲时子进程可能长时间没有任何输出。
+    """
+    beat_file = heartbeat_path(process_name)
+    if os.path.exists(beat_file):
+        os.unlink(beat_file)
+    env = dict(env, HEARTBEAT_FILE=beat_file)
+    proc = subprocess.Popen([PYTHON_EXECUTABLE, "-u", script_name],
+                            stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT,
+                            text=True,
+                            bufsize=1,
+                            errors="replace",
+                            start_new_session=True,  # 终端的 Ctrl+C 不直接发给子进程，由本脚本按顺序停止
+                            env=env)
+    processes[process_name] = proc
+    started = time.time()
+    print(f"Started {process_name} process (PID: {proc.pid}), logging to {os.path.join(LOG_DIR, process_name + '.log')}")
+    pump = threading.Thread(target=pump_output, args=(proc, process_name, logger), name=f"{process_name}Output", daemon=True)
+    pump.start()
+
+    # 等待进程结束、停止信号或存活检查失败
+    while proc.poll() is None and not stop_event.is_set():
+        last_beat = max(started, heartbeat.read(beat_file) or 0.0)
+        if LIVENESS_TIMEOUT and time.time() - last_beat > LIVENESS_TIMEOUT:
+            print(f"--- {process_name} heartbeat is {time.time() - last_beat:.0f}s old, restarting it ---")
+            stop_process(proc, process_name)
+            break
+        time.sleep(1)
+
+    if stop_event.is_set():
+        return None
+    pump.join(timeout=5)
+    return proc.returncode
+
 def run_script(script_name, process_name, stop_event, wait_time=0, env_vars=None):
-    """运行一个Python脚本作为子进程，并监控其状态"""
+    """运行一个Python脚本作为子进程，失败时按指数退避重启"""
     global processes
     try:
         # 等待指定时间（如果需要）
         if wait_time > 0:
             print(f"Waiting {wait_time} seconds before starting {process_name}...")
-            time.sleep(wait_time)
+            if wait_or_stop(wait_time):
+                return
 
-        print(f"--- Starting {process_name}: {script_name} ---")
         # 准备环境变量
         env = os.environ.copy() # 复制当前环境
         if env_vars:
             env.update(env_vars) # 添加或覆盖特定环境变量
-
-        # 使用 Popen 启动进程，并捕获输出（可选）
-        proc = subprocess.Popen([PYTHON_EXECUTABLE, script_name],
-                                stdout=subprocess.PIPE,
-                                stderr=subprocess.PIPE,
-                                text=True,
-                                env=env) # 传递修改后的环境
-        processes[process_name] = proc
-        print(f"Started {process_name} process (PID: {proc.pid})")
-
-        # 等待进程结束或被信号中断
-        while proc.poll() is None and not stop_event.is_set(): # poll() 检查进程是否结束
-            time.sleep(1)
-
-        # 检查进程退出码
-        if proc.poll() is not None:
-            print(f"--- {process_name} ({script_name}) finished with return code {proc.returncode} ---")
-            if proc.returncode != 0:
-                stderr_output = proc.stderr.read() if proc.stderr else "No stderr captured"
-                print(f"--- {process_name} stderr: {stderr_output} ---")
+        logger = build_logger(process_name)
+
+        crashes = []
+        delay = RESTART_BASE_DELAY
+        while not stop_event.is_set():
+            print(f"--- Starting {process_name}: {script_name} ---")
+            started = time.time()
+            returncode = run_once(script_name, process_name, env, logger)
+            if returncode is None:
+                break
+            print(f"--- {process_name} ({script_name}) finished with return code {returncode} ---")
+            if returncode == 0:
+                break
+
+            # 崩溃：记录并检查是否陷入崩溃循环
+            now = time.time()
+            if now - started >= STABLE_SECONDS:
+                delay = RESTART_BASE_DELAY
+            crashes = [t for t in crashes if now - t < CRASH_LOOP_WINDOW] + [now]
+            if len(crashes) >= CRASH_LOOP_LIMIT:
+                print(f"--- {process_name} crashed {len(crashes)} times within {CRASH_LOOP_WINDOW:.0f}s, giving up ---")
+                break
+            print(f"--- Restarting {process_name} in {delay:.0f}s (crash {len(crashes)}/{CRASH_LOOP_LIMIT}) ---")
+            if wait_or_stop(delay):
+                break
+            delay = min(RESTART_MAX_DELAY, delay * 2)
 
     except FileNotFoundError:
-        print(f"--- Script file not found: {script_name} ---")
+        print(f"--- Python executable not found: {PYTHON_EXECUTABLE} ---")
     except Exception as e:
         print(f"--- Unexpected error running {process_name} ({script_name}): {e} ---")
     finally:
-        # 确保进程引用被清理
-        processes[process_name] = None
+        # 确保已退出的进程引用被清理；仍在运行的交给 main 按顺序停止
+        proc = processes.get(process_name)
+        if proc is None or proc.poll() is not None:
+            processes[process_name] = None
 
 def main():
     print("Starting Crawler and Visitor launcher with credentials...")
@@ -90,28 +195,17 @@ def main():
     crawler_thread.start()
     visitor_thread.start()
 
-    try:
-        # 等待两个线程（它们会等待子进程结束或被停止）完成
-        crawler_thread.join()
-        visitor_thread.join()
-        print("Both Crawler and Visitor launcher threads have stopped.")
-    except KeyboardInterrupt:
-        print("\nMain script interrupted.")
-        stop_event.set() # 设置停止事件
-        # 等待线程响应
-        crawler_thread.join()
-        visitor_thread.join()
-
-    # 确保所有子进程都被终止
-    for name, proc in processes.items():
-        if proc and proc.poll() is None: # 检查进程是否仍在运行
-            print(f"Ensuring {name} process (PID: {proc.pid}) is terminated...")
-            proc.terminate() # 尝试优雅终止
-            try:
-                proc.wait(timeout=10) # 等待最多10秒
-            except subprocess.TimeoutExpired:
-                print(f"Force killing {name} process (PID: {proc.pid})...")
-                proc.kill() # 强制杀死
+    # 任意一方仍在运行时保持等待；join 放在循环中以便及时响应信号
+    while (crawler_thread.is_alive() or visitor_thread.is_alive()) and not stop_event.is_set():
+        time.sleep(1)
+
+    # 按启动的逆序停止：先停水帖器，再停爬取器
+    stop_event.set()
+    for name in ('visitor', 'crawler'):
+        stop_process(processes.get(name), name)
+    crawler_thread.join()
+    visitor_thread.join()
+    print("Both Crawler and Visitor launcher threads have stopped.")
 
     print("Launcher script finished.")
 
@@ -0,0 +1,172 @@
+"""posts_count history for topics.db: observations, downsampling and growth rates.
+
+The topic writer appends one `(topic_id, observed_at, posts_count)` row per
+new or changed count to `topic_history`, a WITHOUT ROWID table of integers
+(epoch seconds) clustered by topic, so a topic's series is one contiguous
+range. The count is a step function between observations, so unchanged
+polls are never stored.
+
+`maintain` keeps the table bounded: points older than `raw_seconds` are
+thinned to the last one per topic and hour, older than `hourly_seconds` to
+the last one per day, and older than `retention_seconds` dropped except for
+each topic's latest. It also rolls the recent history up into
+`topic_activity` (posts per day over `window_seconds`), which planners can
+join cheaply instead of reading the history.
+
+    python topic_history.py [limit]     print the most active topics
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+_ROLLUP_SQL = '''
+    INSERT OR REPLACE INTO topic_activity (topic_id, posts_per_day, last_observed_at, computed_at)
+    SELECT r.topic_id,
+           (MAX(r.posts_count) - COALESCE(
+                (SELECT b.posts_count FROM topic_history AS b
+                 WHERE b.topic_id = r.topic_id AND b.observed_at < :since
+                 ORDER BY b.observed_at DESC LIMIT 1),
+                MIN(r.posts_count))) * 86400.0 / :window,
+           MAX(r.observed_at),
+           :now
+    FROM topic_history AS r
+    WHERE r.observed_at >= :since
+    GROUP BY r.topic_id
+'''
+
+
+def record(conn: sqlite3.Connection, observations: Sequence[Tuple[int, int]], observed_at: Optional[int] = None) -> None:
+    """Append `(topic_id, posts_count)` observations inside the caller's transaction."""
+    stamp = int(observed_at if observed_at is not None else time.time())
+    conn.executemany(
+        'INSERT OR REPLACE INTO topic_history (topic_id, observed_at, posts_count) VALUES (?, ?, ?)',
+        [(topic_id, stamp, posts_count) for topic_id, posts_count in observations if posts_count is not None],
+    )
+
+
+def _watermark(conn: sqlite3.Connection, key: str) -> int:
+    row = conn.execute('SELECT value FROM crawl_state WHERE key = ?', (key,)).fetchone()
+    return int(row[0]) if row else 0
+
+
+def _thin(conn: sqlite3.Connection, bucket: int, older_than: int) -> int:
+    """Keep the last point per topic and `bucket` among points that aged past `older_than` since last time."""
+    key = f'history_thinned_{bucket}'
+    low = _watermark(conn, key) // bucket * bucket
+    high = older_than // bucket * bucket
+    if high <= low:
+        return 0
+    deleted = conn.execute(
+        '''
+        DELETE FROM topic_history
+        WHERE observed_at >= :low AND observed_at < :high
+          AND (topic_id, observed_at) NOT IN (
+              SELECT topic_id, MAX(observed_at) FROM topic_history
+              WHERE observed_at >= :low AND observed_at < :high
+              GROUP BY topic_id, observed_at / :bucket
+          )
+        ''',
+        {'low': low, 'high': high, 'bucket': bucket},
+    ).rowcount
+    conn.execute('INSERT OR REPLACE INTO crawl_state (key, value) VALUES (?, ?)', (key, str(high)))
+    return deleted
+
+
+def maintain(
+    conn: sqlite3.Connection,
+    raw_seconds: float,
+    hourly_seconds: float,
+    retention_seconds: float,
+    window_seconds: float,
+    now: Optional[int] = None,
+) -> Dict[str, int]:
+    """Downsample, expire and roll up the history in one transaction; returns row counts."""
+    now = int(now if now is not None else time.time())
+    with conn:
+        stats = {
+            'hourly': _thin(conn, HOUR, now - int(raw_seconds)),
+            'daily': _thin(conn, DAY, now - int(hourly_seconds)),
+        }
+        stats['expired'] = conn.execute(
+            '''
+            DELETE FROM topic_history
+            WHERE observed_at < :cutoff
+              AND observed_at < (SELECT MAX(h.observed_at) FROM topic_history AS h
+                                 WHERE h.topic_id = topic_history.topic_id)
+            ''',
+            {'cutoff': now - int(retention_seconds)},
+        ).rowcount
+        window = max(1, int(window_seconds))
+        stats['active'] = conn.execute(_ROLLUP_SQL, {'since': now - window, 'window': window, 'now': now}).rowcount
+        conn.execute(
+            'UPDATE topic_activity SET posts_per_day = 0, computed_at = ? WHERE computed_at < ? AND posts_per_day != 0',
+            (now, now),
+        )
+    return stats
+
+
+def growth_rate(conn: sqlite3.Connection, topic_id: int, window_seconds: float, now: Optional[int] = None) -> float:
+    """Posts per day gained by `topic_id` over the last `window_seconds`, read from the raw history."""
+    now = int(now if now is not None else time.time())
+    since = now - int(window_seconds)
+    latest = conn.execute(
+        'SELECT posts_count, observed_at FROM topic_history WHERE topic_id = ? ORDER BY observed_at DESC LIMIT 1',
+        (topic_id,),
+    ).fetchone()
+    if latest is None or latest[1] < since:
+        return 0.0
+    baseline = conn.execute(
+        '''
+        SELECT posts_count FROM topic_history WHERE topic_id = ? AND observed_at < ?
+        ORDER BY observed_at DESC LIMIT 1
+        ''',
+        (topic_id, since),
+    ).fetchone() or conn.execute(
+        'SELECT posts_count FROM topic_history WHERE topic_id = ? ORDER BY observed_at LIMIT 1', (topic_id,)
+    ).fetchone()
+    return (latest[0] - baseline[0]) * DAY / max(1, now - since)
+
+
+def activity(conn: sqlite3.Connection, topic_ids: Iterable[int]) -> Dict[int, float]:
+    """Rolled-up posts per day for `topic_ids`; topics without activity are left out."""
+    ids = list(topic_ids)
+    rates: Dict[int, float] = {}
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        placeholders = ','.join('?' * len(chunk))
+        rates.update(
+            conn.execute(
+                f'SELECT topic_id, posts_per_day FROM topic_activity WHERE topic_id IN ({placeholders}) AND posts_per_day > 0',
+                chunk,
+            ).fetchall()
+        )
+    return rates
+
+
+def hottest(conn: sqlite3.Connection, limit: int = 20) -> List[Tuple[int, float]]:
+    """The `limit` topics with the highest rolled-up growth, as `(topic_id, posts_per_day)`."""
+    return conn.execute(
+        'SELECT topic_id, posts_per_day FROM topic_activity WHERE posts_per_day > 0 ORDER BY posts_per_day DESC LIMIT ?',
+        (limit,),
+    ).fetchall()
+
+
+def main() -> None:
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    conn = sqlite3.connect('topics.db')
+    try:
+        for topic_id, rate in hottest(conn, limit):
+            print(f"{topic_id}\t{rate:.1f} posts/day")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,26 @@
 from __future__ import annotations
 
 import os
+import re
+import signal
 import sqlite3
+import threading
+import time
 from contextlib import contextmanager
-from typing import List, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 from camoufox import Camoufox, launch_options
 from playwright.sync_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
 
-from camoufox_helpers import perform_login, solve_turnstile
+import browser_recycling
+import fixtures
+import heartbeat
+import metrics
+import profiling
+import schema
+import topic_history
+from request_budget import PRIORITY_READER, RequestBudget
+from camoufox_helpers import open_logged_in_context, solve_turnstile
 
 USERNAME = os.getenv('LINUX_DO_USERNAME', 'default_user')
 PASSWORD = os.getenv('LINUX_DO_PASSWORD', 'default_pass')
@@ -19,38 +31,295 @@ if USERNAME == 'default_user' or PASSWORD == 'default_pass':
 
 CAMOUFOX_HEADLESS = os.getenv('CAMOUFOX_HEADLESS', '0') == '1'
 CAMOUFOX_DEBUG = os.getenv('CAMOUFOX_DEBUG', '0') == '1'
+SESSION_STATE_PATH = os.getenv('LINUX_DO_SESSION_STATE', 'session_state.json')
+BASE_URL = os.getenv('LINUX_DO_BASE_URL', 'https://linux.do').rstrip('/')
 NAVIGATION_TIMEOUT = int(os.getenv('TPREAD_NAV_TIMEOUT_MS', '15000'))
 SCROLL_DELAY = float(os.getenv('TPREAD_SCROLL_DELAY_SECONDS', '0.4'))
 SCROLL_STEP = int(os.getenv('TPREAD_SCROLL_STEP', '400'))
 MAX_RETRIES = int(os.getenv('TPREAD_VISIT_RETRIES', '3'))
+REQUESTS_PER_SECOND = float(os.getenv('TPREAD_REQUESTS_PER_SECOND', '1'))
+REQUEST_BURST = float(os.getenv('TPREAD_REQUEST_BURST', '2'))
+READY_MODE = os.getenv('TPREAD_READY_MODE', 'signal')
+ADVANCE_MODE = os.getenv('TPREAD_ADVANCE', 'scroll')
+STALL_STEPS = int(os.getenv('TPREAD_STALL_STEPS', '3'))
+EMPTY_PAGE_GRACE_MS = int(os.getenv('TPREAD_EMPTY_PAGE_GRACE_MS', '3000'))
+FOLLOW_CHANGES = os.getenv('TPREAD_FOLLOW', '1') == '1'
+FEED_POLL_SECONDS = float(os.getenv('TPREAD_FEED_POLL_SECONDS', '2'))
+FEED_BATCH_SIZE = int(os.getenv('TPREAD_FEED_BATCH_SIZE', '200'))
+FEED_RETRY_SECONDS = float(os.getenv('TPREAD_FEED_RETRY_SECONDS', '300'))
+FEED_RETRY_LIMIT = int(os.getenv('TPREAD_FEED_RETRY_LIMIT', '5'))
+REPLAN_SECONDS = float(os.getenv('TPREAD_REPLAN_SECONDS', str(6 * 60 * 60)))
+METRICS_FILE = os.getenv('TPREAD_METRICS_FILE')
+METRICS_PORT = int(os.getenv('TPREAD_METRICS_PORT', '0'))
+EVENT_LOG = os.getenv('TPREAD_EVENT_LOG')
+PROFILE_DIR = os.getenv('TPREAD_PROFILE_DIR')
+PROFILE_SECONDS = float(os.getenv('TPREAD_PROFILE_SECONDS', '30'))
+CONTROL_SOCKET = os.getenv('TPREAD_CONTROL_SOCKET')
+RECYCLE_NAVIGATIONS = int(os.getenv('TPREAD_RECYCLE_NAVIGATIONS', '1000'))
+RECYCLE_RSS_MB = float(os.getenv('TPREAD_RECYCLE_RSS_MB', '1024'))
+RECYCLE_CHECK_SECONDS = float(os.getenv('TPREAD_RECYCLE_CHECK_SECONDS', '30'))
+FIXTURE_MODE = os.getenv('TPREAD_FIXTURE_MODE', 'off')  # off | record | replay
+FIXTURE_PATH = os.getenv('TPREAD_FIXTURE_PATH', 'tpread-fixtures.db')
+FIXTURE_SPEED = float(os.getenv('TPREAD_FIXTURE_SPEED', '1'))
+FIXTURE_URLS = os.getenv('TPREAD_FIXTURE_URLS', '.')  # topic pages need their scripts and XHRs to render
+
+NAVIGATION_SECONDS = metrics.histogram('tpread_navigation_seconds', 'Topic page load time including readiness wait, by outcome.')
+SCROLL_SECONDS = metrics.histogram('tpread_scroll_seconds', 'Scroll step time including the scroll delay.')
+STEP_SECONDS = metrics.histogram('tpread_step_seconds', 'Reader loop step time.')
+POSTS_READ = metrics.counter('tpread_posts_read_total', 'Posts advanced past by the reader.')
+TOPICS_READ = metrics.counter('tpread_topics_total', 'Topics finished or aborted by the reader, by outcome.')
+CHECKPOINT_FLUSH_SECONDS = metrics.histogram('tpread_checkpoint_flush_seconds', 'Progress checkpoint transaction time.')
+CHECKPOINT_ROWS = metrics.counter('tpread_checkpoint_rows_total', 'Progress rows flushed to visited_posts.db.')
+BLOCKED_REQUESTS = metrics.counter('tpread_blocked_requests_total', 'Requests aborted by the route filter, by resource type.')
+FETCHED_BYTES = metrics.counter('tpread_fetched_bytes_total', 'Response body bytes received over the network by the reader context.')
+READ_ORDER = os.getenv('TPREAD_ORDER', 'id')
+PLANNER_FETCH_SIZE = int(os.getenv('TPREAD_PLANNER_FETCH_SIZE', '256'))
+# Any route disables Playwright's HTTP cache, so the filter is opt-in; images and
+# web fonts are blocked by the browser itself, which keeps the cache.
+BLOCK_IMAGES = os.getenv('TPREAD_BLOCK_IMAGES', '1') == '1'
+BLOCK_FONTS = os.getenv('TPREAD_BLOCK_FONTS', '1') == '1'
+BLOCK_RESOURCE_TYPES = os.getenv('TPREAD_BLOCK_RESOURCE_TYPES', '')
+BLOCK_URL_PATTERNS = os.getenv('TPREAD_BLOCK_URL_PATTERNS', '')
+ALLOW_URL_PATTERNS = os.getenv('TPREAD_ALLOW_URL_PATTERNS', '')
+CHECKPOINT_SECONDS = float(os.getenv('TPREAD_CHECKPOINT_SECONDS', '5'))
+CHECKPOINT_SYNCHRONOUS = os.getenv('TPREAD_SYNCHRONOUS', 'NORMAL').upper()
+
+PLAN_ORDERS = {
+    'id': 't.id',
+    'unread': 't.posts_count - COALESCE(v.last_visited_posts_count, 1) DESC, t.id',
+    'recent': 't.bumped_at DESC, t.timestamp DESC, t.id',
+    # Predicted activity: posts/day rolled up by water.py from the posts_count history.
+    'hot': 'COALESCE(a.posts_per_day, 0) DESC, t.bumped_at DESC, t.id',
+}
 
 
 def init_visited_db() -> None:
-    """Initialize the visited posts database."""
-    conn = sqlite3.connect('visited_posts.db', check_same_thread=False)
-    cursor = conn.cursor()
-    cursor.execute(
-        '''
-        CREATE TABLE IF NOT EXISTS visited_topics (
-            topic_id INTEGER PRIMARY KEY,
-            last_visited_posts_count INTEGER,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+    """Initialize the visited posts database and migrate both schemas.
+
+    topics.db is migrated here too so the planner can rely on its metadata
+    columns even when the reader starts before the crawler.
+    """
+    schema.migrate_visited_db('visited_posts.db')
+    schema.migrate_topics_db('topics.db')
+
+
+def plan_unread_topics(order: str = READ_ORDER) -> Iterator[Tuple[int, int, int]]:
+    """Stream `(id, posts_count, last_visited)` for topics with unread posts.
+
+    topics.db and visited_posts.db are joined in SQL so fully read topics never
+    reach Python. `order` selects a key from `PLAN_ORDERS`. The ordered ids are
+    snapshotted into a temp table in one statement; pages of
+    `PLANNER_FETCH_SIZE` are then read by plan position, each in its own short
+    read, so a long run never pins a topics.db snapshot (which would stop WAL
+    checkpoints) and every page sees current posts_count values.
+    """
+    if order not in PLAN_ORDERS:
+        raise ValueError(f"Unknown TPREAD_ORDER {order!r}; expected one of {sorted(PLAN_ORDERS)}.")
+    conn = sqlite3.connect('topics.db', check_same_thread=False)
+    try:
+        conn.execute("ATTACH DATABASE 'visited_posts.db' AS visited")
+        conn.execute('CREATE TEMP TABLE plan (pos INTEGER PRIMARY KEY, topic_id INTEGER NOT NULL)')
+        with conn:
+            conn.execute(
+                f'''
+                INSERT INTO temp.plan (topic_id)
+                SELECT t.id
+                FROM topic_ids AS t
+                LEFT JOIN visited.visited_topics AS v ON v.topic_id = t.id
+                LEFT JOIN topic_activity AS a ON a.topic_id = t.id
+                WHERE t.posts_count > COALESCE(v.last_visited_posts_count, 1)
+                ORDER BY {PLAN_ORDERS[order]}
+                '''
+            )
+        planned = 0
+        position = 0
+        while True:
+            rows = conn.execute(
+                '''
+                SELECT p.pos, t.id, t.posts_count, COALESCE(v.last_visited_posts_count, 1)
+                FROM temp.plan AS p
+                JOIN topic_ids AS t ON t.id = p.topic_id
+                LEFT JOIN visited.visited_topics AS v ON v.topic_id = t.id
+                WHERE p.pos > ? AND t.posts_count > COALESCE(v.last_visited_posts_count, 1)
+                ORDER BY p.pos
+                LIMIT ?
+                ''',
+                (position, PLANNER_FETCH_SIZE),
+            ).fetchall()
+            if not rows:
+                break
+            position = rows[-1][0]
+            for _pos, topic_id, posts_count, last_visited in rows:
+                planned += 1
+                yield int(topic_id), int(posts_count), int(last_visited)
+        print(f"Planner finished: {planned} topics with unread posts (order={order}).")
+    finally:
+        conn.close()
+
+
+def _split_setting(value: str) -> List[str]:
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+class RouteFilter:
+    """Abort requests by resource type or URL regex and count traffic per topic.
+
+    Allow patterns win over both deny rules. Blocked requests are counted (their
+    size is never known); fetched bytes are the encoded body sizes of finished
+    requests, so cache hits count as 0. The route is only installed when a
+    deny rule is set, because routing turns off the HTTP cache. Requests it
+    lets through fall back to earlier routes (fixture replay), or the network
+    when there are none.
+    """
+
+    def __init__(self, block_types: str, block_patterns: str, allow_patterns: str) -> None:
+        self.block_types = set(_split_setting(block_types))
+        self.block_patterns = [re.compile(p) for p in _split_setting(block_patterns)]
+        self.allow_patterns = [re.compile(p) for p in _split_setting(allow_patterns)]
+        self.reset()
+
+    def reset(self) -> None:
+        """Start a fresh set of per-topic counters."""
+        self.blocked: Dict[str, int] = {}
+        self.fetched_requests = 0
+        self.fetched_bytes = 0
+
+    @property
+    def active(self) -> bool:
+        return bool(self.block_types or self.block_patterns)
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        if any(p.search(url) for p in self.allow_patterns):
+            return False
+        return resource_type in self.block_types or any(p.search(url) for p in self.block_patterns)
+
+    def install(self, context) -> None:
+        """Attach the route handler and response counter to a browser context."""
+        context.on("requestfinished", self._on_request_finished)
+        if self.active:
+            context.route("**/*", self._handle_route)
+
+    def summary(self) -> str:
+        blocked = sum(self.blocked.values())
+        by_type = ', '.join(f"{kind}={count}" for kind, count in sorted(self.blocked.items())) or 'none'
+        return (
+            f"fetched {self.fetched_requests} requests / {self.fetched_bytes / 1024:.1f} KiB, "
+            f"blocked {blocked} ({by_type})"
         )
-        '''
-    )
-    conn.commit()
-    conn.close()
+
+    def _handle_route(self, route) -> None:
+        request = route.request
+        try:
+            if self.should_block(request.resource_type, request.url):
+                self.blocked[request.resource_type] = self.blocked.get(request.resource_type, 0) + 1
+                BLOCKED_REQUESTS.inc(resource_type=request.resource_type)
+                route.abort()
+            else:
+                route.fallback()
+        except PlaywrightError:
+            pass
+
+    def _on_request_finished(self, request) -> None:
+        self.fetched_requests += 1
+        try:
+            size = max(0, request.sizes()['responseBodySize'])
+        except (PlaywrightError, KeyError):
+            return
+        self.fetched_bytes += size
+        FETCHED_BYTES.inc(size)
 
 
-def read_topics() -> List[Tuple[int, int]]:
-    """Fetch topics from topics.db."""
-    conn = sqlite3.connect('topics.db', check_same_thread=False)
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, posts_count FROM topic_ids ORDER BY id')
-    rows = cursor.fetchall()
-    conn.close()
-    print(f"Read {len(rows)} topics from topics.db")
-    return rows
+route_filter = RouteFilter(BLOCK_RESOURCE_TYPES, BLOCK_URL_PATTERNS, ALLOW_URL_PATTERNS)
+budget = RequestBudget(REQUESTS_PER_SECOND, REQUEST_BURST)
+fixture_store: Optional[fixtures.FixtureStore] = None  # opened by main() when FIXTURE_MODE is set
+
+
+class ChangeFeed:
+    """Follow water.py's `topic_changes` log from a cursor kept in visited_posts.db."""
+
+    def __init__(self) -> None:
+        self._conn = sqlite3.connect('topics.db', check_same_thread=False)
+        self._conn.execute("ATTACH DATABASE 'visited_posts.db' AS visited")
+
+    def cursor(self) -> Optional[int]:
+        """Last fully processed change sequence number, or None before the first catch-up."""
+        row = self._conn.execute("SELECT value FROM visited.reader_state WHERE key = 'change_cursor'").fetchone()
+        return int(row[0]) if row else None
+
+    def save_cursor(self, seq: int) -> None:
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO visited.reader_state (key, value) VALUES ('change_cursor', ?)", (str(seq),)
+            )
+
+    def head(self) -> int:
+        """Newest change sequence number written so far, even if its row was pruned."""
+        try:
+            row = self._conn.execute(
+                '''
+                SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'topic_changes'),
+                                (SELECT MAX(seq) FROM topic_changes))
+                '''
+            ).fetchone()
+        except sqlite3.OperationalError:
+            return 0
+        return int(row[0] or 0)
+
+    def missed(self, cursor: int) -> bool:
+        """Whether water.py pruned changes after `cursor` before they were read."""
+        try:
+            following = self._conn.execute('SELECT MIN(seq) FROM topic_changes WHERE seq > ?', (cursor,)).fetchone()[0]
+        except sqlite3.OperationalError:
+            return False
+        if following is None:
+            return self.head() > cursor
+        return following > cursor + 1
+
+    def unread(self, topic_ids: Iterable[int]) -> List[Tuple[int, int, int]]:
+        """`(id, posts_count, last_visited)` for those of `topic_ids` that still have unread posts."""
+        ids = list(topic_ids)
+        if not ids:
+            return []
+        placeholders = ','.join('?' * len(ids))
+        rows = self._conn.execute(
+            f'''
+            SELECT t.id, t.posts_count, COALESCE(v.last_visited_posts_count, 1)
+            FROM topic_ids AS t
+            LEFT JOIN visited.visited_topics AS v ON v.topic_id = t.id
+            WHERE t.id IN ({placeholders}) AND t.posts_count > COALESCE(v.last_visited_posts_count, 1)
+            ''',
+            ids,
+        ).fetchall()
+        return [(int(a), int(b), int(c)) for a, b, c in rows]
+
+    def next_batch(self, after: int) -> Tuple[Optional[int], List[Tuple[int, int, int]]]:
+        """Return the last sequence number read and the unread topics changed after `after`.
+
+        Topics come in change order, or fastest-growing first with
+        TPREAD_ORDER=hot. The sequence number is None when nothing new has been
+        logged.
+        """
+        try:
+            changes = self._conn.execute(
+                'SELECT seq, topic_id FROM topic_changes WHERE seq > ? ORDER BY seq LIMIT ?',
+                (after, FEED_BATCH_SIZE),
+            ).fetchall()
+        except sqlite3.OperationalError:
+            return None, []
+        if not changes:
+            return None, []
+        ordered: Dict[int, int] = {}
+        for seq, topic_id in changes:
+            ordered[topic_id] = seq
+        rows = self.unread(ordered)
+        rows.sort(key=lambda row: ordered[row[0]])
+        if READ_ORDER == 'hot':
+            rates = topic_history.activity(self._conn, [row[0] for row in rows])
+            rows.sort(key=lambda row: -rates.get(row[0], 0.0))
+        return changes[-1][0], rows
+
+    def close(self) -> None:
+        self._conn.close()
 
 
 def build_camoufox_options():
@@ -59,53 +328,173 @@ def build_camoufox_options():
         headless=CAMOUFOX_HEADLESS,
         disable_coop=True,
         humanize=True,
-        block_images=False,
+        block_images=BLOCK_IMAGES,
         block_webrtc=False,
+        firefox_user_prefs={'gfx.downloadable_fonts.enabled': False} if BLOCK_FONTS else {},
     )
 
 
+def open_reader_context(browser):
+    """Open a logged-in context on `browser` with the route filter and post tracker installed.
+
+    When replaying fixtures the context is offline and needs no login; the
+    replay route goes first so the route filter can fall back into it.
+    """
+    if FIXTURE_MODE == 'replay':
+        context = fixtures.open_replay_context(browser, fixture_store, NAVIGATION_TIMEOUT, ignore_https_errors=True)
+    else:
+        context = open_logged_in_context(
+            browser,
+            USERNAME,
+            PASSWORD,
+            SESSION_STATE_PATH,
+            timeout=NAVIGATION_TIMEOUT,
+            base_url=BASE_URL,
+            ignore_https_errors=True,
+        )
+        if FIXTURE_MODE == 'record':
+            fixtures.record_context(fixture_store, context, FIXTURE_URLS)
+    route_filter.install(context)
+    context.add_init_script(POST_TRACKER_SCRIPT)
+    return context
+
+
 @contextmanager
 def camoufox_context():
     """Yield a logged-in browser context."""
     launch_kwargs = dict(from_options=build_camoufox_options(), debug=CAMOUFOX_DEBUG)
     with Camoufox(**launch_kwargs) as browser:
-        context = browser.new_context(ignore_https_errors=True)
-        context.set_default_timeout(NAVIGATION_TIMEOUT)
+        context = open_reader_context(browser)
         try:
-            if not perform_login(context, USERNAME, PASSWORD):
-                raise RuntimeError("Login failed. Verify credentials or challenge response.")
             yield context
         finally:
             context.close()
 
 
-def lookup_last_visited(cursor, topic_id: int) -> int:
-    cursor.execute('SELECT last_visited_posts_count FROM visited_topics WHERE topic_id = ?', (topic_id,))
-    row = cursor.fetchone()
-    return int(row[0]) if row else 1
-
-
-def persist_last_visited(cursor, topic_id: int, count: int) -> None:
-    cursor.execute(
-        '''
-        INSERT OR REPLACE INTO visited_topics (topic_id, last_visited_posts_count, timestamp)
-        VALUES (?, ?, CURRENT_TIMESTAMP)
-        ''',
-        (topic_id, count),
-    )
+class ProgressCheckpointer:
+    """Buffer per-topic read progress and flush it to visited_posts.db in batches.
+
+    A background thread flushes every `interval` seconds, so at most that much
+    progress can be lost on a crash; `complete` and `close` flush immediately.
+    """
+
+    def __init__(self, db_path: str, interval: float = CHECKPOINT_SECONDS, synchronous: str = CHECKPOINT_SYNCHRONOUS) -> None:
+        if synchronous not in ('OFF', 'NORMAL', 'FULL', 'EXTRA'):
+            raise ValueError(f"Unknown TPREAD_SYNCHRONOUS {synchronous!r}.")
+        self.interval = max(0.5, interval)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(f'PRAGMA synchronous={synchronous}')
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._pending: Dict[int, int] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="CheckpointFlusher", daemon=True)
+        self._thread.start()
+
+    def record(self, topic_id: int, count: int) -> None:
+        """Remember progress in memory; it reaches disk on the next flush."""
+        with self._lock:
+            self._pending[topic_id] = count
+
+    def complete(self, topic_id: int, count: int) -> None:
+        """Record a finished topic and flush right away."""
+        self.record(topic_id, count)
+        self.flush()
+
+    def flush(self) -> int:
+        """Write all buffered progress in one transaction; returns rows written.
+
+        The buffer is swapped out under `_lock` and written under `_write_lock`,
+        so `record` never waits for the commit. The write lock is taken first
+        so concurrent flushes commit in the order they took their rows.
+        """
+        with self._write_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                rows = list(self._pending.items())
+                self._pending = {}
+            started = time.perf_counter()
+            try:
+                with self._conn:
+                    self._conn.executemany(
+                        '''
+                        INSERT OR REPLACE INTO visited_topics (topic_id, last_visited_posts_count, timestamp)
+                        VALUES (?, ?, CURRENT_TIMESTAMP)
+                        ''',
+                        rows,
+                    )
+            except sqlite3.Error as exc:
+                print(f"Checkpoint flush failed: {exc}")
+                with self._lock:
+                    for topic_id, count in rows:
+                        self._pending.setdefault(topic_id, count)
+                return 0
+        CHECKPOINT_FLUSH_SECONDS.observe(time.perf_counter() - started)
+        CHECKPOINT_ROWS.inc(len(rows))
+        return len(rows)
+
+    def close(self) -> None:
+        """Stop the timer, flush what is left and close the connection."""
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+        self._conn.close()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+
+POST_TRACKER_SCRIPT = """
+(() => {
+  if (window.top !== window || window.__postTracker) return;
+  const tracker = { max: 0, seen: new Set() };
+  window.__postTracker = tracker;
+  const consider = (node) => {
+    const id = node.id || '';
+    if (!id.startsWith('post_')) return;
+    const n = Number(id.slice(5));
+    if (!Number.isFinite(n)) return;
+    tracker.seen.add(n);
+    if (n > tracker.max) tracker.max = n;
+  };
+  const note = (node) => {
+    if (!node || node.nodeType !== 1) return;
+    consider(node);
+    node.querySelectorAll('[id^="post_"]').forEach(consider);
+  };
+  const start = () => {
+    note(document.documentElement);
+    new MutationObserver((mutations) => {
+      for (const mutation of mutations) mutation.addedNodes.forEach(note);
+    }).observe(document.documentElement, { childList: true, subtree: true });
+  };
+  if (document.documentElement) start();
+  else document.addEventListener('DOMContentLoaded', start, { once: true });
+})();
+"""
 
 
 def highest_post_number(page) -> int:
-    """Return the highest post number currently visible on the page."""
+    """Return the highest post number rendered on the page so far.
+
+    Reads the running maximum kept by `POST_TRACKER_SCRIPT`; falls back to a
+    full DOM scan when the tracker is missing.
+    """
     try:
         value = page.evaluate(
             """
 () => {
-  const nodes = Array.from(document.querySelectorAll('[id^="post_"]'));
-  const nums = nodes
-    .map(el => Number((el.id || '').split('_')[1]))
-    .filter(n => Number.isFinite(n));
-  return nums.length ? Math.max(...nums) : 0;
+  const tracker = window.__postTracker;
+  if (tracker) return tracker.max;
+  let max = 0;
+  for (const el of document.querySelectorAll('[id^="post_"]')) {
+    const n = Number((el.id || '').split('_')[1]);
+    if (Number.isFinite(n) && n > max) max = n;
+  }
+  return max;
 }
 """
         )
@@ -116,73 +505,321 @@ def highest_post_number(page) -> int:
 
 def smooth_scroll(page) -> None:
     """Scroll the page to mimic human behaviour."""
-    try:
-        page.mouse.wheel(0, SCROLL_STEP)
-    except PlaywrightError:
-        pass
-    page.wait_for_timeout(int(SCROLL_DELAY * 1_000))
+    with SCROLL_SECONDS.time():
+        try:
+            page.mouse.wheel(0, SCROLL_STEP)
+        except PlaywrightError:
+            pass
+        page.wait_for_timeout(int(SCROLL_DELAY * 1_000))
+
+
+POST_READY_SCRIPT = """
+([target, graceMs]) => {
+  const tracker = window.__postTracker;
+  if (tracker && tracker.seen.size > 0 && (tracker.max >= target || document.readyState === 'complete')) {
+    return 'posts';
+  }
+  if (document.querySelector('.page-not-found, .not-found-container')) return 'empty';
+  if (document.readyState !== 'complete' || document.querySelector('.post-stream')) return false;
+  window.__noPostsSince = window.__noPostsSince || Date.now();
+  return Date.now() - window.__noPostsSince >= graceMs ? 'empty' : false;
+}
+"""
 
 
-def visit_topic(page, cursor, topic_id: int, posts_count: int, last_visited: int) -> None:
-    """Visit unread posts for the given topic."""
+def wait_until_ready(page, target: int) -> bool:
+    """Wait until the topic page is usable; False if it settled without posts.
+
+    "signal" mode waits for the post stream to render `target` (or any posts
+    once the document has loaded). Discourse's "doesn't exist or is private"
+    page, or a fully loaded document with no post stream for
+    `EMPTY_PAGE_GRACE_MS`, ends the wait as a page without posts.
+    "networkidle" keeps the old behaviour, which Discourse's long-polling
+    often drags out to the full timeout.
+    """
+    if READY_MODE == 'networkidle':
+        page.wait_for_load_state("networkidle")
+        return True
+    handle = page.wait_for_function(POST_READY_SCRIPT, arg=[target, EMPTY_PAGE_GRACE_MS], timeout=NAVIGATION_TIMEOUT)
+    return handle.json_value() == 'posts'
+
+
+def load_topic_page(page, topic_id: int, post_number: int) -> Optional[bool]:
+    """Navigate to a post of a topic, retrying timeouts.
+
+    Returns True once posts render, False for a page without posts (deleted,
+    private or not found) and None if it never loaded. Each navigation takes
+    a token from the reader's request `budget`.
+    """
+    url = f"{BASE_URL}/t/topic/{topic_id}/{post_number}"
+    for attempt in range(1, MAX_RETRIES + 1):
+        budget.acquire(PRIORITY_READER)
+        started = time.perf_counter()
+        try:
+            page.goto(url, wait_until="domcontentloaded", timeout=NAVIGATION_TIMEOUT)
+            solve_turnstile(page)
+            has_posts = wait_until_ready(page, post_number)
+            NAVIGATION_SECONDS.observe(time.perf_counter() - started, outcome='ok' if has_posts else 'empty')
+            return has_posts
+        except PlaywrightTimeoutError:
+            NAVIGATION_SECONDS.observe(time.perf_counter() - started, outcome='timeout')
+            print(f"  -> Timeout navigating to {url} (attempt {attempt}/{MAX_RETRIES}).")
+        except PlaywrightError as exc:
+            NAVIGATION_SECONDS.observe(time.perf_counter() - started, outcome='error')
+            print(f"  -> Error navigating to {url}: {exc}")
+            break
+    print(f"  -> Unable to load {url}, aborting topic {topic_id}; {route_filter.summary()}.")
+    return None
+
+
+def visit_topic(page, checkpointer: ProgressCheckpointer, topic_id: int, posts_count: int, last_visited: int) -> bool:
+    """Visit unread posts for the given topic; False if it was aborted.
+
+    A topic whose page loads without posts is recorded as read up to
+    `posts_count`, since reloading it will not change that.
+
+    With `ADVANCE_MODE` "scroll" the topic is loaded once and read by
+    scrolling; a fresh navigation only happens after `STALL_STEPS` scroll
+    steps without new posts. "goto" navigates for every step as before.
+    """
     if posts_count <= last_visited:
         print(f"Topic {topic_id}: posts_count ({posts_count}) <= last_visited ({last_visited}). Skipping.")
-        return
+        return True
 
     print(f"Topic {topic_id}: Visiting posts {last_visited} -> {posts_count}")
+    route_filter.reset()
     current = max(1, last_visited)
+    loaded = False
+    stalled = 0
+    steps = 0
+    started = time.perf_counter()
 
     while current < posts_count:
-        next_url = f"https://linux.do/t/topic/{topic_id}/{current}"
-        success = False
-        for attempt in range(1, MAX_RETRIES + 1):
-            try:
-                page.goto(next_url, wait_until="domcontentloaded", timeout=NAVIGATION_TIMEOUT)
-                solve_turnstile(page)
-                page.wait_for_load_state("networkidle")
-                success = True
-                break
-            except PlaywrightTimeoutError:
-                print(f"  -> Timeout navigating to {next_url} (attempt {attempt}/{MAX_RETRIES}).")
-            except PlaywrightError as exc:
-                print(f"  -> Error navigating to {next_url}: {exc}")
-                break
-        if not success:
-            print(f"  -> Unable to load {next_url}, aborting topic {topic_id}.")
-            return
-
-        max_seen = highest_post_number(page)
-        smooth_scroll(page)
-        max_seen = max(max_seen, current)
-        current = min(posts_count, max(current + 1, max_seen))
-        persist_last_visited(cursor, topic_id, current)
-        cursor.connection.commit()
+        step_started = time.perf_counter()
+        heartbeat.beat()
+        profiling.trace_checkpoint(page)
+        previous = current
+        if not loaded:
+            has_posts = load_topic_page(page, topic_id, current)
+            if has_posts is None:
+                TOPICS_READ.inc(outcome='aborted')
+                metrics.event('topic_aborted', topic_id=topic_id, post=current)
+                return False
+            if not has_posts:
+                print(f"Topic {topic_id}: page has no posts (deleted, private or login required); marking it read.")
+                checkpointer.complete(topic_id, posts_count)
+                TOPICS_READ.inc(outcome='empty')
+                metrics.event('topic_empty', topic_id=topic_id, post=current)
+                return True
+            loaded = ADVANCE_MODE == 'scroll'
+            max_seen = highest_post_number(page)
+            smooth_scroll(page)
+        else:
+            smooth_scroll(page)
+            max_seen = highest_post_number(page)
+        steps += 1
+
+        if max_seen > current:
+            current = min(posts_count, max_seen)
+            stalled = 0
+        elif not loaded:
+            current = min(posts_count, current + 1)
+        else:
+            stalled += 1
+            if stalled >= STALL_STEPS:
+                current = min(posts_count, current + 1)
+                loaded = False
+                stalled = 0
+        checkpointer.record(topic_id, current)
+        POSTS_READ.inc(current - previous)
+        STEP_SECONDS.observe(time.perf_counter() - step_started)
         print(f"  -> Progressed to post {current} for topic {topic_id}.")
 
-    persist_last_visited(cursor, topic_id, posts_count)
-    cursor.connection.commit()
-    print(f"Topic {topic_id}: Updated visited_posts.db to {posts_count}.")
+    checkpointer.complete(topic_id, posts_count)
+    step_ms = (time.perf_counter() - started) * 1_000 / max(1, steps)
+    TOPICS_READ.inc(outcome='completed')
+    metrics.event('topic_completed', topic_id=topic_id, posts_count=posts_count, steps=steps, step_ms=round(step_ms, 1))
+    print(
+        f"Topic {topic_id}: Updated visited_posts.db to {posts_count} in {steps} steps "
+        f"({step_ms:.0f} ms/step); {route_filter.summary()}."
+    )
+    return True
+
+
+def _raise_system_exit(signum, frame):
+    raise SystemExit(f"Received signal {signum}")
+
+
+class FailedTopics:
+    """Topics that failed to load, with per-topic attempt counts and backoff.
+
+    The n-th failure of a topic makes it due again after
+    `base_seconds * 2 ** (n - 1)`; after `limit` failures it is given up on.
+    """
+
+    def __init__(self, limit: int = FEED_RETRY_LIMIT, base_seconds: float = FEED_RETRY_SECONDS) -> None:
+        self.limit = max(1, limit)
+        self.base_seconds = base_seconds
+        self._attempts: Dict[int, int] = {}
+        self._due: Dict[int, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._attempts)
+
+    def add(self, topic_id: int) -> bool:
+        """Count a failure; True (and the topic is forgotten) once it reached `limit`."""
+        attempts = self._attempts.get(topic_id, 0) + 1
+        if attempts >= self.limit:
+            self.discard(topic_id)
+            return True
+        self._attempts[topic_id] = attempts
+        self._due[topic_id] = time.time() + self.base_seconds * 2 ** (attempts - 1)
+        return False
+
+    def discard(self, topic_id: int) -> None:
+        self._attempts.pop(topic_id, None)
+        self._due.pop(topic_id, None)
+
+    def due(self) -> List[int]:
+        """Ids whose backoff has expired."""
+        now = time.time()
+        return [topic_id for topic_id, due in self._due.items() if due <= now]
+
+
+def read_topics(
+    page,
+    checkpointer: ProgressCheckpointer,
+    topics: Iterable[Tuple[int, int, int]],
+    failed: Optional[FailedTopics] = None,
+):
+    """Visit each `(id, posts_count, last_visited)` entry, logging per-topic failures.
+
+    With `failed`, aborted topics are counted there and finished ones cleared;
+    a topic that fails `failed.limit` times is marked read up to its current
+    posts_count so neither retries nor replans keep loading it. Returns the
+    page to keep using, which changes when the context is recycled.
+    """
+    for topic_id, posts_count, last_visited in topics:
+        heartbeat.beat()
+        page = browser_recycling.checkpoint(page)
+        try:
+            done = visit_topic(page, checkpointer, topic_id, posts_count, last_visited)
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"Error processing topic {topic_id}: {exc}")
+            done = False
+        if failed is None:
+            continue
+        if done:
+            failed.discard(topic_id)
+        elif failed.add(topic_id):
+            print(f"Topic {topic_id}: giving up after {failed.limit} failed attempts; marking it read up to {posts_count}.")
+            checkpointer.complete(topic_id, posts_count)
+            TOPICS_READ.inc(outcome='abandoned')
+    return page
+
+
+def catch_up(page, checkpointer: ProgressCheckpointer, feed: ChangeFeed, failed: FailedTopics):
+    """Read the full unread plan and move the cursor to the head taken before it; returns `(page, cursor)`."""
+    head = feed.head()
+    page = read_topics(page, checkpointer, plan_unread_topics(), failed)
+    checkpointer.flush()
+    feed.save_cursor(head)
+    return page, head
+
+
+def follow_changes(page, checkpointer: ProgressCheckpointer, feed: ChangeFeed, failed: FailedTopics) -> None:
+    """Read topics as water.py logs changes, resuming from the persisted cursor.
+
+    Without a cursor, or when water.py pruned changes the cursor had not
+    reached yet, the full unread plan runs first; the cursor is then set to
+    the feed head taken before planning, so nothing logged meanwhile is lost.
+    Topics that fail are retried with backoff as tracked by `failed`, and the
+    full plan reruns every `REPLAN_SECONDS` to pick up failures lost across
+    restarts; both count towards a topic's `FEED_RETRY_LIMIT`.
+    """
+    cursor = feed.cursor()
+    replan_due = time.time() + REPLAN_SECONDS
+    if cursor is not None:
+        print(f"Following topic changes from sequence {cursor}.")
+    while True:
+        replan = REPLAN_SECONDS > 0 and time.time() >= replan_due
+        if cursor is None or replan or feed.missed(cursor):
+            if replan:
+                print("Periodic replan of unread topics.")
+            elif cursor is not None:
+                print(f"Change feed was pruned past sequence {cursor}; replanning unread topics.")
+            page, cursor = catch_up(page, checkpointer, feed, failed)
+            replan_due = time.time() + REPLAN_SECONDS
+            print(f"Following topic changes from sequence {cursor}.")
+            continue
+        due = failed.due()
+        if due:
+            retry = feed.unread(due)
+            for topic_id in set(due).difference(row[0] for row in retry):
+                failed.discard(topic_id)  # read meanwhile, or gone from topic_ids
+            print(f"Retrying {len(retry)} topics that failed earlier ({len(failed)} pending).")
+            page = read_topics(page, checkpointer, retry, failed)
+            checkpointer.flush()
+        seq, topics = feed.next_batch(cursor)
+        if seq is None:
+            heartbeat.beat()
+            page = browser_recycling.checkpoint(page)
+            profiling.trace_checkpoint(page)
+            time.sleep(FEED_POLL_SECONDS)
+            continue
+        if topics:
+            print(f"Change feed: {len(topics)} topics with unread posts up to sequence {seq}.")
+        page = read_topics(page, checkpointer, topics, failed)
+        checkpointer.flush()
+        feed.save_cursor(seq)
+        cursor = seq
+
+
+def open_fixture_store() -> None:
+    global fixture_store  # pylint: disable=global-statement
+    if FIXTURE_MODE not in ('record', 'replay'):
+        return
+    fixture_store = fixtures.FixtureStore(FIXTURE_PATH, FIXTURE_SPEED)
+    print(f"Fixture {FIXTURE_MODE} mode, {FIXTURE_PATH}: {fixture_store.summary()}.")
 
 
 def main():
+    metrics.start_exporters(METRICS_FILE, METRICS_PORT, EVENT_LOG)
+    if PROFILE_DIR:
+        profiling.install('tpread', PROFILE_DIR, PROFILE_SECONDS, CONTROL_SOCKET)
     init_visited_db()
-    topics = read_topics()
-
-    visited_conn = sqlite3.connect('visited_posts.db', check_same_thread=False)
-    visited_cursor = visited_conn.cursor()
+    open_fixture_store()
+    signal.signal(signal.SIGTERM, _raise_system_exit)
+    checkpointer = ProgressCheckpointer('visited_posts.db')
+    feed = ChangeFeed()
+    failed = FailedTopics()  # outlives browser restarts
 
-    with camoufox_context() as context:
-        page = context.new_page()
-        page.set_default_timeout(NAVIGATION_TIMEOUT)
-        for topic_id, posts_count in topics:
+    try:
+        while True:
             try:
-                last_visited = lookup_last_visited(visited_cursor, topic_id)
-                visit_topic(page, visited_cursor, topic_id, posts_count, last_visited)
-            except Exception as exc:  # pylint: disable=broad-except
-                print(f"Error processing topic {topic_id}: {exc}")
-        page.close()
-
-    visited_conn.close()
+                with camoufox_context() as context, browser_recycling.recycled_page(
+                    context,
+                    lambda: open_reader_context(context.browser),
+                    NAVIGATION_TIMEOUT,
+                    RECYCLE_NAVIGATIONS,
+                    RECYCLE_RSS_MB,
+                    RECYCLE_CHECK_SECONDS,
+                ) as page:
+                    if FOLLOW_CHANGES:
+                        follow_changes(page, checkpointer, feed, failed)
+                    else:
+                        read_topics(page, checkpointer, plan_unread_topics())
+                break
+            except browser_recycling.BrowserRestartRequested as exc:
+                # Flushed progress keeps the re-planned run from repeating finished topics.
+                print(f"{exc}; relaunching the browser.")
+                checkpointer.flush()
+    finally:
+        feed.close()
+        checkpointer.close()
+        if fixture_store is not None:
+            print(f"Fixture store {FIXTURE_PATH}: {fixture_store.summary()}.")
+            fixture_store.close()
     print("Browser closed and script finished.")
 
 
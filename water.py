@@ -2,18 +2,37 @@
 
 from __future__ import annotations
 
+import hashlib
 import json
 import os
+import queue
+import signal
 import sqlite3
 import threading
 import time
+import tracemalloc
+from array import array
+from bisect import bisect_left
 from contextlib import contextmanager
-from typing import Iterable, Optional, Sequence, Set, Tuple
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
 
 from camoufox import Camoufox, launch_options
 from playwright.sync_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
 
-from camoufox_helpers import perform_login, solve_turnstile
+import browser_recycling
+import fixtures
+import heartbeat
+import metrics
+import profiling
+import schema
+import topic_history
+from camoufox_helpers import open_logged_in_context, solve_turnstile
+from request_budget import PRIORITY_BACKFILL, PRIORITY_MONITOR, RequestBudget
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib decoder is the fallback
+    orjson = None
 
 USERNAME = os.getenv('LINUX_DO_USERNAME', 'default_user')
 PASSWORD = os.getenv('LINUX_DO_PASSWORD', 'default_pass')
@@ -22,48 +41,466 @@ if USERNAME == 'default_user' or PASSWORD == 'default_pass':
 
 CAMOUFOX_HEADLESS = os.getenv('CAMOUFOX_HEADLESS', '0') == '1'
 CAMOUFOX_DEBUG = os.getenv('CAMOUFOX_DEBUG', '0') == '1'
+SESSION_STATE_PATH = os.getenv('LINUX_DO_SESSION_STATE', 'session_state.json')
+BASE_URL = os.getenv('LINUX_DO_BASE_URL', 'https://linux.do').rstrip('/')
 ENUMERATOR_DELAY = int(os.getenv('WATER_ENUMERATOR_DELAY_SECONDS', str(90 * 60)))
 NAVIGATION_TIMEOUT = int(os.getenv('WATER_NAV_TIMEOUT_MS', '15000'))
 JSON_FETCH_RETRIES = int(os.getenv('WATER_JSON_RETRIES', '2'))
+RATE_LIMIT_BACKOFF_SECONDS = float(os.getenv('WATER_RATE_LIMIT_BACKOFF_SECONDS', '10'))  # without Retry-After
 RESTART_DELAY_SECONDS = int(os.getenv('WATER_BROWSER_RESTART_DELAY', '5'))
+DB_PATH = 'topics.db'
+WRITER_BATCH_SIZE = int(os.getenv('WATER_WRITER_BATCH_SIZE', '500'))
+WRITER_FLUSH_SECONDS = float(os.getenv('WATER_WRITER_FLUSH_SECONDS', '2'))
+CHANGE_RETENTION_DAYS = float(os.getenv('WATER_CHANGE_RETENTION_DAYS', '7'))
+CHANGE_PRUNE_EVERY = int(os.getenv('WATER_CHANGE_PRUNE_EVERY', '200'))
+HISTORY_RAW_HOURS = float(os.getenv('WATER_HISTORY_RAW_HOURS', '48'))
+HISTORY_HOURLY_DAYS = float(os.getenv('WATER_HISTORY_HOURLY_DAYS', '30'))
+HISTORY_RETENTION_DAYS = float(os.getenv('WATER_HISTORY_RETENTION_DAYS', '365'))
+HISTORY_WINDOW_HOURS = float(os.getenv('WATER_HISTORY_WINDOW_HOURS', '24'))
+HISTORY_MAINTAIN_SECONDS = float(os.getenv('WATER_HISTORY_MAINTAIN_SECONDS', '600'))
+INDEX_MERGE_THRESHOLD = int(os.getenv('WATER_INDEX_MERGE_THRESHOLD', '4096'))
+ENUMERATOR_WINDOW = int(os.getenv('WATER_ENUMERATOR_WINDOW', '3'))
+RESUME_DRIFT_PAGES = int(os.getenv('WATER_RESUME_DRIFT_PAGES', '2'))
+RESUME_MAX_AGE = int(os.getenv('WATER_RESUME_MAX_AGE_SECONDS', str(6 * 60 * 60)))
+CRAWL_CYCLES_KEPT = int(os.getenv('WATER_CRAWL_CYCLES_KEPT', '5'))
+ENUMERATOR_QUIET_PAGES = int(os.getenv('WATER_ENUMERATOR_QUIET_PAGES', '3'))
+FULL_ENUMERATION_INTERVAL = int(os.getenv('WATER_FULL_ENUMERATION_SECONDS', str(24 * 60 * 60)))
+CACHE_REPORT_EVERY = int(os.getenv('WATER_CACHE_REPORT_EVERY', '300'))
+JSON_TRANSPORT = os.getenv('WATER_JSON_TRANSPORT', 'request')
+REQUESTS_PER_SECOND = float(os.getenv('WATER_REQUESTS_PER_SECOND', '3'))
+REQUEST_BURST = float(os.getenv('WATER_REQUEST_BURST', '3'))
+PROJECT_TOPICS = os.getenv('WATER_PROJECT_TOPICS', '1') == '1'
+TRACE_ALLOCATIONS = os.getenv('WATER_TRACE_ALLOCATIONS', '0') == '1'
+JSON_DECODER = 'orjson' if orjson is not None else 'json'
+POLL_MIN_SECONDS = float(os.getenv('WATER_POLL_MIN_SECONDS', '1'))
+POLL_MAX_SECONDS = float(os.getenv('WATER_POLL_MAX_SECONDS', '30'))
+POLL_EWMA_ALPHA = float(os.getenv('WATER_POLL_EWMA_ALPHA', '0.2'))
+POLL_TARGET_CHANGES = float(os.getenv('WATER_POLL_TARGET_CHANGES', '1'))
+METRICS_FILE = os.getenv('WATER_METRICS_FILE')
+METRICS_PORT = int(os.getenv('WATER_METRICS_PORT', '0'))
+EVENT_LOG = os.getenv('WATER_EVENT_LOG')
+PROFILE_DIR = os.getenv('WATER_PROFILE_DIR')
+PROFILE_SECONDS = float(os.getenv('WATER_PROFILE_SECONDS', '30'))
+CONTROL_SOCKET = os.getenv('WATER_CONTROL_SOCKET')
+RECYCLE_NAVIGATIONS = int(os.getenv('WATER_RECYCLE_NAVIGATIONS', '1000'))  # navigations plus request/in-page fetches
+RECYCLE_RSS_MB = float(os.getenv('WATER_RECYCLE_RSS_MB', '2048'))  # whole process: both crawler browsers
+RECYCLE_CHECK_SECONDS = float(os.getenv('WATER_RECYCLE_CHECK_SECONDS', '30'))
+FIXTURE_MODE = os.getenv('WATER_FIXTURE_MODE', 'off')  # off | record | replay
+FIXTURE_PATH = os.getenv('WATER_FIXTURE_PATH', 'water-fixtures.db')
+FIXTURE_SPEED = float(os.getenv('WATER_FIXTURE_SPEED', '1'))
+FIXTURE_URLS = os.getenv('WATER_FIXTURE_URLS', r'/latest\.json')
+
+FETCH_SECONDS = metrics.histogram('water_fetch_seconds', 'JSON fetch latency by transport.')
+FETCH_BYTES = metrics.counter('water_fetch_bytes_total', 'JSON response bytes by transport.')
+FETCH_RETRIES = metrics.counter('water_fetch_retries_total', 'JSON fetch attempts that failed, by reason.')
+DECODE_SECONDS = metrics.histogram('water_json_decode_seconds', 'Decode and projection time per response, by decoder.')
+DECODE_PEAK_BYTES = metrics.histogram(
+    'water_json_decode_peak_bytes',
+    'Peak Python allocation while decoding one response (WATER_TRACE_ALLOCATIONS=1).',
+    buckets=(16_384, 65_536, 262_144, 1_048_576, 4_194_304, 16_777_216),
+)
+CACHE_LOOKUPS = metrics.counter('water_response_cache_total', 'Monitor response cache lookups by result.')
+PARSE_SECONDS = metrics.histogram('water_parse_topics_seconds', 'parse_topics time per page.')
+TOPICS_SEEN = metrics.counter('water_topics_seen_total', 'Topics parsed from latest.json pages.')
+TOPICS_CHANGED = metrics.counter('water_topics_changed_total', 'Topics that were new or had a new posts_count.')
+PAGES_PROCESSED = metrics.counter('water_pages_total', 'latest.json pages processed, by worker.')
+UPSERT_SECONDS = metrics.histogram('water_db_upsert_seconds', 'Writer transaction latency.')
+UPSERT_ROWS = metrics.counter('water_db_upserted_rows_total', 'Rows written by the topic writer.')
+HISTORY_ROLLUP_SECONDS = metrics.histogram('water_history_maintain_seconds', 'posts_count history downsampling and rollup time.')
+WRITER_QUEUE_DEPTH = metrics.gauge('water_writer_queue_depth', 'Upsert batches waiting for the writer.')
+BROWSER_RESTARTS = metrics.counter('water_browser_restarts_total', 'Browser restarts after a crash, by worker.')
+POLL_INTERVAL = metrics.gauge('water_poll_interval_seconds', 'Current monitor poll interval.')
+CHANGE_RATE = metrics.gauge('water_change_rate_per_second', 'EWMA of changed topics per second seen by the monitor.')
+
+# latest.json topic fields kept by the projection, in `TopicRow` order.
+TOPIC_FIELDS = ('id', 'posts_count', 'highest_post_number', 'bumped_at', 'last_posted_at', 'category_id')
+TopicRow = Tuple[int, int, Optional[int], Optional[str], Optional[str], Optional[int]]
+TOPIC_ROW_WIDTH = len(TOPIC_FIELDS)
+
+UPSERT_TOPIC_SQL = '''
+    INSERT INTO topic_ids (id, posts_count, highest_post_number, bumped_at, last_posted_at, category_id)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (id) DO UPDATE SET
+        timestamp = CASE WHEN excluded.posts_count IS topic_ids.posts_count
+                         THEN topic_ids.timestamp ELSE CURRENT_TIMESTAMP END,
+        posts_count = excluded.posts_count,
+        highest_post_number = COALESCE(excluded.highest_post_number, topic_ids.highest_post_number),
+        bumped_at = COALESCE(excluded.bumped_at, topic_ids.bumped_at),
+        last_posted_at = COALESCE(excluded.last_posted_at, topic_ids.last_posted_at),
+        category_id = COALESCE(excluded.category_id, topic_ids.category_id)
+'''
+
+
+class PageProgress(NamedTuple):
+    """Outcome of one enumerated page, committed by the writer after the page's rows."""
+
+    cycle_id: int
+    page: int
+    outcome: str  # ok | end | failed | malformed
+    topics: int = 0
+    changed: int = 0
+    newest_seen: str = ''
+    status: Optional[str] = None  # set to close the cycle, e.g. 'completed'
+
 
-db_lock = threading.Lock()
 id_set_lock = threading.Lock()
 stop_event = threading.Event()
-id_data_set: Set[Tuple[int, int]] = set()
+budget = RequestBudget(REQUESTS_PER_SECOND, REQUEST_BURST)
+fixture_store: Optional[fixtures.FixtureStore] = None  # opened by main() when FIXTURE_MODE is set
 
 
 def init_db() -> None:
-    """Initialize SQLite database and schema."""
-    conn = sqlite3.connect('topics.db', check_same_thread=False)
-    cursor = conn.cursor()
-    cursor.execute(
-        '''
-        CREATE TABLE IF NOT EXISTS topic_ids (
-            id INTEGER PRIMARY KEY,
-            posts_count INTEGER,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-        '''
-    )
-    conn.commit()
-    conn.close()
+    """Initialize SQLite database and bring its schema up to date."""
+    schema.migrate_topics_db(DB_PATH)
 
 
-def add_or_update_ids_in_db(data_to_upsert: Sequence[Tuple[int, int]]) -> None:
-    """Insert or update `(id, posts_count)` rows into the database."""
-    if not data_to_upsert:
-        return
-    with db_lock:
+def load_crawl_state(key: str) -> Optional[str]:
+    """Read a persisted crawler value such as the enumeration high-water mark."""
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    try:
+        row = conn.execute('SELECT value FROM crawl_state WHERE key = ?', (key,)).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def save_crawl_state(key: str, value: str) -> None:
+    """Persist a crawler value, replacing any previous one."""
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    try:
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO crawl_state (key, value) VALUES (?, ?)', (key, value))
+    finally:
+        conn.close()
+
+
+def open_crawl_cycle(start_page: int, incremental: bool) -> Tuple[int, int, str]:
+    """Resume the interrupted enumeration cycle or start a new one.
+
+    A `running` cycle of the same mode that made progress within
+    `RESUME_MAX_AGE` seconds is resumed `RESUME_DRIFT_PAGES` pages before its
+    last completed page, since bumps and deletions shift topics between
+    pages. Returns `(cycle_id, page to fetch next, newest bump seen so far)`.
+    """
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    try:
+        with conn:
+            row = conn.execute(
+                '''
+                SELECT cycle_id, incremental, start_page, last_page, COALESCE(newest_seen, ''),
+                       (julianday('now') - julianday(updated_at)) * 86400
+                FROM crawl_cycles WHERE status = 'running'
+                ORDER BY cycle_id DESC LIMIT 1
+                '''
+            ).fetchone()
+            if row is not None:
+                cycle_id, was_incremental, was_start, last_page, newest_seen, age = row
+                if bool(was_incremental) == incremental and was_start == start_page and age <= RESUME_MAX_AGE:
+                    resume_page = start_page if last_page is None else max(start_page, last_page + 1 - RESUME_DRIFT_PAGES)
+                    return cycle_id, resume_page, newest_seen
+            conn.execute("UPDATE crawl_cycles SET status = 'abandoned' WHERE status = 'running'")
+            cursor = conn.execute(
+                'INSERT INTO crawl_cycles (incremental, start_page) VALUES (?, ?)', (int(incremental), start_page)
+            )
+            return cursor.lastrowid, start_page, ''
+    finally:
+        conn.close()
+
+
+class TopicWriter:
+    """Single writer owning a WAL connection; batches upserts from all crawler threads.
+
+    Rows submitted with `record_change` are also appended to `topic_changes`,
+    the feed tpread follows; metadata-only backfills are not. Feed rows older
+    than `CHANGE_RETENTION_DAYS` are pruned every few commits. The same
+    changes are appended to `topic_history`, which is downsampled and rolled
+    up into `topic_activity` every `HISTORY_MAINTAIN_SECONDS`.
+
+    Enumeration progress goes through the same queue, so a page's cursor
+    update commits in the same transaction as its rows or a later one, never
+    before them.
+    """
+
+    def __init__(self, db_path: str, batch_size: int, flush_seconds: float) -> None:
+        self.db_path = db_path
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = max(0.1, flush_seconds)
+        self._queue: "queue.Queue[Optional[Tuple[List[tuple], bool, List[PageProgress]]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self.commits = 0
+        self.rows_written = 0
+        self.last_commit_ms = 0.0
+        self._history_due = time.time() + HISTORY_MAINTAIN_SECONDS
+
+    def start(self) -> None:
+        """Spawn the writer thread if it is not running yet."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self.run, name="TopicWriter", daemon=True)
+        self._thread.start()
+
+    def submit(self, rows: Sequence[tuple], record_change: bool = True) -> None:
+        """Queue `TopicRow`s (or bare `(id, posts_count)` pairs) for the next transaction."""
+        if rows:
+            self._queue.put((list(rows), record_change, []))
+            WRITER_QUEUE_DEPTH.set(self._queue.qsize())
+
+    def submit_progress(self, progress: PageProgress) -> None:
+        """Queue an enumeration cursor update behind everything already submitted."""
+        self._queue.put(([], False, [progress]))
+        WRITER_QUEUE_DEPTH.set(self._queue.qsize())
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def stop(self) -> None:
+        """Make `run` flush everything still queued and return; joins the thread from `start`."""
+        self._queue.put(None)
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def run(self) -> None:
+        """Blocking writer loop; `start` runs it on a thread, the asyncio engine via `to_thread`."""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        pending: List[tuple] = []
+        changes: List[Tuple[int, int]] = []
+        progress: List[PageProgress] = []
+        deadline = 0.0
         try:
-            conn = sqlite3.connect('topics.db', check_same_thread=False)
-            cursor = conn.cursor()
-            cursor.executemany('INSERT OR REPLACE INTO topic_ids (id, posts_count) VALUES (?, ?)', data_to_upsert)
-            conn.commit()
+            while True:
+                wait = min(1.0, max(0.0, deadline - time.time())) if pending or progress else 1.0
+                try:
+                    item = self._queue.get(timeout=wait)
+                except queue.Empty:
+                    item = ([], False, [])
+                if item is None:
+                    break
+                heartbeat.beat()
+                if (item[0] or item[2]) and not (pending or progress):
+                    deadline = time.time() + self.flush_seconds
+                self._collect(item, pending, changes, progress)
+                if (pending or progress) and (
+                    len(pending) >= self.batch_size or time.time() >= deadline or stop_event.is_set()
+                ):
+                    self._commit(conn, pending, changes, progress)
+                    pending, changes, progress = [], [], []
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item:
+                    self._collect(item, pending, changes, progress)
+            self._commit(conn, pending, changes, progress)
+        finally:
             conn.close()
-            print(f"Thread {threading.current_thread().name}: Upserted {len(data_to_upsert)} records.")
+
+    @staticmethod
+    def _collect(
+        item: Tuple[List[tuple], bool, List[PageProgress]],
+        pending: List[tuple],
+        changes: List[Tuple[int, int]],
+        progress: List[PageProgress],
+    ) -> None:
+        rows, record_change, page_progress = item
+        for row in rows:
+            if len(row) < TOPIC_ROW_WIDTH:
+                row = tuple(row) + (None,) * (TOPIC_ROW_WIDTH - len(row))
+            pending.append(row)
+            if record_change:
+                changes.append((row[0], row[1]))
+        progress.extend(page_progress)
+
+    @staticmethod
+    def _record_progress(conn: sqlite3.Connection, progress: List[PageProgress]) -> None:
+        for entry in progress:
+            conn.execute(
+                'INSERT OR REPLACE INTO crawl_pages (cycle_id, page, outcome, topics, changed) VALUES (?, ?, ?, ?, ?)',
+                (entry.cycle_id, entry.page, entry.outcome, entry.topics, entry.changed),
+            )
+            conn.execute(
+                '''
+                UPDATE crawl_cycles SET
+                    last_page = CASE WHEN ? = 'ok' THEN MAX(COALESCE(last_page, -1), ?) ELSE last_page END,
+                    newest_seen = MAX(COALESCE(newest_seen, ''), ?),
+                    status = COALESCE(?, status),
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE cycle_id = ?
+                ''',
+                (entry.outcome, entry.page, entry.newest_seen, entry.status, entry.cycle_id),
+            )
+            if entry.status:
+                conn.execute(
+                    '''
+                    DELETE FROM crawl_pages WHERE cycle_id NOT IN
+                        (SELECT cycle_id FROM crawl_cycles ORDER BY cycle_id DESC LIMIT ?)
+                    ''',
+                    (max(1, CRAWL_CYCLES_KEPT),),
+                )
+
+    def _commit(
+        self,
+        conn: sqlite3.Connection,
+        rows: List[tuple],
+        changes: List[Tuple[int, int]],
+        progress: Sequence[PageProgress] = (),
+    ) -> None:
+        if not rows and not progress:
+            return
+        started = time.perf_counter()
+        try:
+            with conn:
+                conn.executemany(UPSERT_TOPIC_SQL, rows)
+                conn.executemany('INSERT INTO topic_changes (topic_id, posts_count) VALUES (?, ?)', changes)
+                topic_history.record(conn, changes)
+                if progress:
+                    self._record_progress(conn, list(progress))
+                if CHANGE_PRUNE_EVERY and self.commits % CHANGE_PRUNE_EVERY == 0:
+                    conn.execute(
+                        "DELETE FROM topic_changes WHERE changed_at < datetime('now', ?)",
+                        (f'-{CHANGE_RETENTION_DAYS} days',),
+                    )
         except sqlite3.Error as exc:
-            print(f"Database error in {threading.current_thread().name}: {exc}")
+            print(f"Thread {threading.current_thread().name}: Database error: {exc}")
+            return
+        elapsed = time.perf_counter() - started
+        self.last_commit_ms = elapsed * 1_000
+        self.commits += 1
+        self.rows_written += len(rows)
+        UPSERT_SECONDS.observe(elapsed)
+        UPSERT_ROWS.inc(len(rows))
+        WRITER_QUEUE_DEPTH.set(self.queue_depth())
+        if rows:
+            print(
+                f"Thread {threading.current_thread().name}: Upserted {len(rows)} records in "
+                f"{self.last_commit_ms:.1f} ms (queue depth {self.queue_depth()})."
+            )
+        if HISTORY_MAINTAIN_SECONDS and time.time() >= self._history_due:
+            self._maintain_history(conn)
+
+    def _maintain_history(self, conn: sqlite3.Connection) -> None:
+        self._history_due = time.time() + HISTORY_MAINTAIN_SECONDS
+        started = time.perf_counter()
+        try:
+            stats = topic_history.maintain(
+                conn,
+                raw_seconds=HISTORY_RAW_HOURS * 3600,
+                hourly_seconds=HISTORY_HOURLY_DAYS * 86400,
+                retention_seconds=HISTORY_RETENTION_DAYS * 86400,
+                window_seconds=HISTORY_WINDOW_HOURS * 3600,
+            )
+        except sqlite3.Error as exc:
+            print(f"Thread {threading.current_thread().name}: History maintenance failed: {exc}")
+            return
+        elapsed = time.perf_counter() - started
+        HISTORY_ROLLUP_SECONDS.observe(elapsed)
+        print(
+            f"Thread {threading.current_thread().name}: History maintenance in {elapsed * 1000:.0f} ms: "
+            f"thinned {stats['hourly']} hourly / {stats['daily']} daily, expired {stats['expired']}, "
+            f"{stats['active']} active topics."
+        )
+
+
+class TopicIndex:
+    """Compact topic id -> latest posts_count map backed by sorted `array('q')` columns."""
+
+    def __init__(self, merge_threshold: int = INDEX_MERGE_THRESHOLD) -> None:
+        self.merge_threshold = max(1, merge_threshold)
+        self._ids = array('q')
+        self._counts = array('q')
+        self._overflow: Dict[int, int] = {}
+        self._backfill = array('q')
+
+    def __len__(self) -> int:
+        return len(self._ids) + len(self._overflow)
+
+    def load(self, db_path: str) -> None:
+        """Bulk-load the index from `topic_ids`, replacing any current contents.
+
+        Rows that predate the metadata columns are remembered so the next crawl
+        of their page rewrites them even if posts_count has not moved.
+        """
+        ids = array('q')
+        counts = array('q')
+        backfill = array('q')
+        conn = sqlite3.connect(db_path, check_same_thread=False)
+        try:
+            query = 'SELECT id, posts_count, bumped_at IS NULL FROM topic_ids ORDER BY id'
+            for topic_id, posts_count, missing in conn.execute(query):
+                ids.append(int(topic_id))
+                counts.append(int(posts_count or 0))
+                if missing:
+                    backfill.append(int(topic_id))
+        finally:
+            conn.close()
+        self._ids, self._counts, self._overflow, self._backfill = ids, counts, {}, backfill
+        if backfill:
+            print(f"Topic index: {len(backfill)} topics are missing metadata and will be backfilled.")
+
+    def diff_and_update(self, pairs: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """Return pairs whose posts_count is new or changed and record them in place."""
+        ids, counts, overflow = self._ids, self._counts, self._overflow
+        changed: List[Tuple[int, int]] = []
+        lo = 0
+        for topic_id, posts_count in sorted(pairs):
+            i = bisect_left(ids, topic_id, lo)
+            lo = i
+            if i < len(ids) and ids[i] == topic_id:
+                if counts[i] != posts_count:
+                    counts[i] = posts_count
+                    changed.append((topic_id, posts_count))
+            elif overflow.get(topic_id) != posts_count:
+                overflow[topic_id] = posts_count
+                changed.append((topic_id, posts_count))
+        if len(overflow) >= self.merge_threshold:
+            self._merge()
+        return changed
+
+    def take_backfill(self, topic_ids: Iterable[int]) -> Set[int]:
+        """Return (and forget) the ids among `topic_ids` that still need metadata.
+
+        Pending ids live in a sorted `array('q')` (filled in id order by
+        `load`), so a large backlog costs 8 bytes per id.
+        """
+        backfill = self._backfill
+        if not backfill:
+            return set()
+        due: Set[int] = set()
+        for topic_id in sorted(set(topic_ids), reverse=True):
+            i = bisect_left(backfill, topic_id)
+            if i < len(backfill) and backfill[i] == topic_id:
+                del backfill[i]
+                due.add(topic_id)
+        return due
+
+    def _merge(self) -> None:
+        """Fold the overflow dict into the sorted columns."""
+        ids = array('q')
+        counts = array('q')
+        old_ids, old_counts = self._ids, self._counts
+        i = 0
+        for topic_id, posts_count in sorted(self._overflow.items()):
+            while i < len(old_ids) and old_ids[i] < topic_id:
+                ids.append(old_ids[i])
+                counts.append(old_counts[i])
+                i += 1
+            ids.append(topic_id)
+            counts.append(posts_count)
+        ids.extend(old_ids[i:])
+        counts.extend(old_counts[i:])
+        self._ids, self._counts, self._overflow = ids, counts, {}
+
+
+topic_writer = TopicWriter(DB_PATH, WRITER_BATCH_SIZE, WRITER_FLUSH_SECONDS)
+topic_index = TopicIndex()
+
+
+def add_or_update_ids_in_db(data_to_upsert: Sequence[tuple], record_change: bool = True) -> None:
+    """Queue `TopicRow`s (or `(id, posts_count)` pairs) for the shared database writer."""
+    topic_writer.submit(data_to_upsert, record_change)
 
 
 def build_camoufox_options():
@@ -77,140 +514,749 @@ def build_camoufox_options():
     )
 
 
+def open_crawler_context(browser):
+    """Open a logged-in context on `browser` (an offline one when replaying fixtures)."""
+    if FIXTURE_MODE == 'replay':
+        return fixtures.open_replay_context(browser, fixture_store, NAVIGATION_TIMEOUT, ignore_https_errors=True)
+    context = open_logged_in_context(
+        browser,
+        USERNAME,
+        PASSWORD,
+        SESSION_STATE_PATH,
+        timeout=NAVIGATION_TIMEOUT,
+        base_url=BASE_URL,
+        ignore_https_errors=True,
+    )
+    if FIXTURE_MODE == 'record':
+        fixtures.record_context(fixture_store, context, FIXTURE_URLS)
+    return context
+
+
 @contextmanager
 def camoufox_context():
     """Yield a logged-in browser context."""
     launch_kwargs = dict(from_options=build_camoufox_options(), debug=CAMOUFOX_DEBUG)
     with Camoufox(**launch_kwargs) as browser:
-        context = browser.new_context(ignore_https_errors=True)
-        context.set_default_timeout(NAVIGATION_TIMEOUT)
+        context = open_crawler_context(browser)
         try:
-            if not perform_login(context, USERNAME, PASSWORD):
-                raise RuntimeError("Login failed. Verify credentials or challenge response.")
             yield context
         finally:
             context.close()
 
 
-def wait_with_stop(seconds: int) -> None:
+def wait_with_stop(seconds: float) -> None:
     """Sleep while respecting the global stop flag."""
     end = time.time() + seconds
-    while time.time() < end and not stop_event.is_set():
-        time.sleep(1)
+    while not stop_event.is_set():
+        heartbeat.beat()
+        remaining = end - time.time()
+        if remaining <= 0:
+            break
+        time.sleep(min(1, remaining))
+
+
+class PollScheduler:
+    """Derive the monitor's poll interval from an EWMA of topic changes per second.
+
+    The interval aims for about `target_changes` changes per poll, stays within
+    `[min_interval, max_interval]`, and drops straight to `min_interval` when a
+    single poll sees more than `target_changes` changes.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = POLL_MIN_SECONDS,
+        max_interval: float = POLL_MAX_SECONDS,
+        alpha: float = POLL_EWMA_ALPHA,
+        target_changes: float = POLL_TARGET_CHANGES,
+    ) -> None:
+        self.min_interval = max(0.1, min_interval)
+        self.max_interval = max(self.min_interval, max_interval)
+        self.alpha = min(1.0, max(0.01, alpha))
+        self.target_changes = max(0.01, target_changes)
+        self.change_rate = 0.0
+        self.interval = self.min_interval
+        self._last_observed = time.monotonic()
+
+    def observe(self, changes: int) -> float:
+        """Record the changes seen since the previous call and return the next interval."""
+        now = time.monotonic()
+        elapsed = max(1e-3, now - self._last_observed)
+        self._last_observed = now
+        observed = changes / elapsed
+        if changes and observed > self.change_rate:
+            self.change_rate = observed
+        else:
+            self.change_rate += self.alpha * (observed - self.change_rate)
+        if self.change_rate > 0:
+            wanted = self.target_changes / self.change_rate
+        else:
+            wanted = self.max_interval
+        if changes > self.target_changes:
+            wanted = self.min_interval
+        self.interval = min(self.max_interval, max(self.min_interval, wanted))
+        POLL_INTERVAL.set(self.interval)
+        CHANGE_RATE.set(self.change_rate)
+        return self.interval
+
+
+UNCHANGED: dict = {}
+"""Marker returned by `fetch_json_payload` when a cached response is still current."""
+
+
+class ResponseCache:
+    """Per-URL validators and body digests used to skip re-decoding unchanged polls."""
+
+    def __init__(self) -> None:
+        self._validators: Dict[str, Tuple[str, str]] = {}
+        self._digests: Dict[str, bytes] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def headers_unchanged(self, url: str, headers: Dict[str, str]) -> bool:
+        """True when ETag/Last-Modified match the last decoded response for `url`."""
+        validators = (headers.get('etag', ''), headers.get('last-modified', ''))
+        if any(validators) and self._validators.get(url) == validators:
+            self.hits += 1
+            CACHE_LOOKUPS.inc(result='hit')
+            return True
+        return False
+
+    def body_unchanged(self, url: str, raw: Union[str, bytes]) -> bool:
+        """True when `raw` hashes to the last decoded body for `url`."""
+        if self._digests.get(url) == self._digest(raw):
+            self.hits += 1
+            CACHE_LOOKUPS.inc(result='hit')
+            return True
+        self.misses += 1
+        CACHE_LOOKUPS.inc(result='miss')
+        return False
+
+    def remember(self, url: str, raw: Union[str, bytes], headers: Dict[str, str]) -> None:
+        """Record a successfully decoded response."""
+        self._digests[url] = self._digest(raw)
+        self._validators[url] = (headers.get('etag', ''), headers.get('last-modified', ''))
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @staticmethod
+    def _digest(raw: Union[str, bytes]) -> bytes:
+        data = raw.encode('utf-8') if isinstance(raw, str) else raw
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class TransportStats:
+    """Thread-safe latency and byte totals per JSON transport."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._totals: Dict[str, List[float]] = {}
+
+    def record(self, transport: str, seconds: float, size: int) -> None:
+        with self._lock:
+            totals = self._totals.setdefault(transport, [0, 0.0, 0])
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] += size
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Per-transport fetch count, mean latency (ms) and mean bytes."""
+        with self._lock:
+            return {
+                name: {'fetches': count, 'avg_ms': seconds * 1_000 / count, 'avg_bytes': size / count}
+                for name, (count, seconds, size) in self._totals.items()
+                if count
+            }
+
+
+transport_stats = TransportStats()
+
+
+def record_fetch(transport: str, seconds: float, size: int) -> None:
+    """Feed one completed fetch into the transport summary and the metrics registry."""
+    transport_stats.record(transport, seconds, size)
+    FETCH_SECONDS.observe(seconds, transport=transport)
+    FETCH_BYTES.inc(size, transport=transport)
+
+
+_PROJECT_TOPICS_JS = """
+const projectTopics = (data, fields) => {
+    const topicList = data && data.topic_list;
+    const topics = topicList && Array.isArray(topicList.topics)
+        ? topicList.topics.map(topic => fields.map(field => topic[field] ?? null))
+        : null;
+    const projected = {topic_list: {topics}};
+    if (data && data.error_type !== undefined) {
+        projected.error_type = data.error_type;
+    }
+    return JSON.stringify(projected);
+};
+"""
+
+PROJECT_TOPICS_SCRIPT = """
+(fields) => {
+""" + _PROJECT_TOPICS_JS + """
+    let data;
+    try {
+        data = JSON.parse(document.body ? document.body.innerText : '');
+    } catch (e) {
+        return '';
+    }
+    return projectTopics(data, fields);
+}
+"""
+
+FETCH_WINDOW_SCRIPT = """
+async ({urls, fields, timeoutMs}) => {
+""" + _PROJECT_TOPICS_JS + """
+    return Promise.all(urls.map(async (url) => {
+        try {
+            const response = await fetch(url, {
+                headers: {Accept: 'application/json'},
+                credentials: 'include',
+                signal: AbortSignal.timeout(timeoutMs),
+            });
+            if (!(response.headers.get('content-type') || '').includes('json')) {
+                return '';
+            }
+            return projectTopics(await response.json(), fields);
+        } catch (e) {
+            return '';
+        }
+    }));
+}
+"""
+
+
+def loads_json(raw: Union[str, bytes]):
+    """Decode JSON with orjson when it is installed, else the stdlib."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
 
 
-def fetch_json_payload(page, url: str) -> Optional[dict]:
-    """Load JSON data and handle captcha retries."""
+def project_topic_list(payload) -> dict:
+    """Reduce a decoded latest.json document to `error_type` plus `TOPIC_FIELDS` rows."""
+    if not isinstance(payload, dict):
+        raise ValueError("Unexpected JSON document.")
+    topic_list = payload.get('topic_list')
+    topics = topic_list.get('topics') if isinstance(topic_list, dict) else None
+    rows = [[topic.get(field) for field in TOPIC_FIELDS] for topic in topics if isinstance(topic, dict)] \
+        if isinstance(topics, list) else None
+    projected = {'topic_list': {'topics': rows}}
+    if 'error_type' in payload:
+        projected['error_type'] = payload['error_type']
+    return projected
+
+
+@contextmanager
+def allocation_probe():
+    """Record the peak traced allocation of the block when TRACE_ALLOCATIONS is on.
+
+    tracemalloc is process-wide, so concurrent workers inflate each other's peaks.
+    """
+    if not TRACE_ALLOCATIONS:
+        yield
+        return
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    try:
+        yield
+    finally:
+        _, peak = tracemalloc.get_traced_memory()
+        DECODE_PEAK_BYTES.observe(max(0, peak - baseline))
+
+
+def decode_topic_payload(raw: Union[str, bytes], projected: bool) -> dict:
+    """Decode a latest.json body into the projected shape; `projected` bodies already are."""
+    with allocation_probe(), DECODE_SECONDS.time(decoder=JSON_DECODER):
+        payload = loads_json(raw)
+        if projected:
+            if not isinstance(payload, dict):
+                raise ValueError("Unexpected JSON document.")
+            return payload
+        return project_topic_list(payload)
+
+
+def request_json_text(page, url: str) -> Tuple[Optional[bytes], Dict[str, str]]:
+    """Fetch `url` through the context's request API, sharing its cookies.
+
+    The body is returned as bytes so the decoder can read it without a copy.
+    JSON error bodies (`invalid_parameters`, `rate_limit`) are returned like
+    any other; only a non-JSON answer (a challenge page) gives `(None,
+    headers)` so the caller can fall back to a full navigation. The request API bypasses
+    routing, so fixtures are recorded and replayed here explicitly.
+    """
+    started = time.perf_counter()
+    if FIXTURE_MODE == 'replay':
+        fixture = fixture_store.serve('GET', url)
+        if fixture is None:
+            return None, {}
+        record_fetch('request', time.perf_counter() - started, len(fixture.body))
+        return fixture.body, fixture.headers
+    response = page.request.get(url, headers={'Accept': 'application/json'}, timeout=NAVIGATION_TIMEOUT)
+    browser_recycling.count_fetches()
+    headers = response.headers
+    if 'json' not in headers.get('content-type', ''):
+        print(
+            f"{threading.current_thread().name}: Request API got status {response.status} "
+            f"({headers.get('content-type', 'unknown')}) for {url}; falling back to navigation."
+        )
+        response.dispose()
+        return None, headers
+    if not response.ok:
+        print(f"{threading.current_thread().name}: Request API got status {response.status} for {url}.")
+    body = response.body()
+    elapsed = time.perf_counter() - started
+    record_fetch('request', elapsed, len(body))
+    if FIXTURE_MODE == 'record':
+        fixture_store.add('GET', url, response.status, headers, body, elapsed * 1000)
+    return body, headers
+
+
+def navigate_json_text(
+    page, url: str, cache: Optional[ResponseCache] = None, project: bool = False
+) -> Tuple[Optional[str], Dict[str, str]]:
+    """Fetch `url` by navigating the page and reading the rendered body text.
+
+    With `project`, the page parses the JSON itself and only the projected
+    topic list crosses the Playwright protocol; an empty string means the body
+    was not JSON. Returns `(None, headers)` when `cache` says the response is
+    unchanged.
+    """
+    started = time.perf_counter()
+    response = page.goto(url, wait_until="domcontentloaded", timeout=NAVIGATION_TIMEOUT)
+    headers = response.headers if response is not None else {}
+    if cache is not None and cache.headers_unchanged(url, headers):
+        return None, headers
+    if project:
+        raw = page.evaluate(PROJECT_TOPICS_SCRIPT, list(TOPIC_FIELDS))
+    else:
+        raw = page.evaluate("() => document.body ? document.body.innerText : ''")
+    transport = 'page-projected' if project else 'page'
+    record_fetch(transport, time.perf_counter() - started, len(raw.encode('utf-8')) if raw else 0)
+    return raw, headers
+
+
+def benchmark_transports(page, url: str, rounds: int = 10) -> Dict[str, Dict[str, float]]:
+    """Time both JSON transports against `url` and return their summaries.
+
+    Sizes are body bytes for both transports (page text is UTF-8 encoded).
+    """
+    results: Dict[str, Dict[str, float]] = {}
+    for name, fetch in (('request', request_json_text), ('page', navigate_json_text)):
+        stats = TransportStats()
+        for _ in range(rounds):
+            started = time.perf_counter()
+            raw, _headers = fetch(page, url)
+            size = len(raw.encode('utf-8') if isinstance(raw, str) else raw) if raw else 0
+            stats.record(name, time.perf_counter() - started, size)
+        results.update(stats.summary())
+    for name, summary in results.items():
+        print(f"Transport {name}: {summary['avg_ms']:.1f} ms, {summary['avg_bytes']:.0f} bytes per fetch over {rounds} fetches.")
+    return results
+
+
+def rate_limit_wait(headers: Dict[str, str]) -> float:
+    """Seconds to back off after a `rate_limit` answer: Retry-After, else the configured default."""
+    try:
+        return max(1.0, float(headers.get('retry-after', '')))
+    except ValueError:
+        return RATE_LIMIT_BACKOFF_SECONDS
+
+
+def fetch_json_payload(
+    page,
+    url: str,
+    cache: Optional[ResponseCache] = None,
+    priority: int = PRIORITY_BACKFILL,
+    transport: Optional[str] = None,
+) -> Optional[dict]:
+    """Load JSON data and handle captcha retries.
+
+    Every attempt first takes a token from `budget` at `priority`. Uses the
+    request API when `transport` (default `JSON_TRANSPORT`) is "request" and
+    falls back to page navigation for challenge pages. A `rate_limit` answer
+    waits out `rate_limit_wait` and uses up an attempt. The payload is always projected to
+    `TOPIC_FIELDS` rows (see `decode_topic_payload`). With a `cache`, returns
+    `UNCHANGED` instead of decoding a response identical to the previous one
+    for the same URL.
+    """
+    transport = transport or JSON_TRANSPORT
     for _ in range(JSON_FETCH_RETRIES):
-        if stop_event.is_set():
+        if not budget.acquire(priority, stop_event):
             return None
         try:
-            page.goto(url, wait_until="domcontentloaded", timeout=NAVIGATION_TIMEOUT)
-            raw = page.evaluate("() => document.body ? document.body.innerText : ''")
+            raw: Union[str, bytes, None] = None
+            projected = False
+            if transport == 'request':
+                raw, headers = request_json_text(page, url)
+                if raw is not None and cache is not None and cache.headers_unchanged(url, headers):
+                    return UNCHANGED
+            if raw is None:
+                raw, headers = navigate_json_text(page, url, cache, PROJECT_TOPICS)
+                if raw is None:
+                    return UNCHANGED
+                projected = PROJECT_TOPICS
             if not raw:
                 raise ValueError("Empty response body.")
-            return json.loads(raw)
+            if cache is not None and cache.body_unchanged(url, raw):
+                return UNCHANGED
+            payload = decode_topic_payload(raw, projected)
+            if payload.get('error_type') == 'rate_limit':
+                wait = rate_limit_wait(headers)
+                FETCH_RETRIES.inc(reason='rate_limit')
+                print(f"{threading.current_thread().name}: Rate limited on {url}; backing off {wait:.0f}s.")
+                if stop_event.wait(wait):
+                    return None
+                continue
+            if cache is not None:
+                cache.remember(url, raw, headers)
+            return payload
         except (ValueError, json.JSONDecodeError) as exc:
+            FETCH_RETRIES.inc(reason='decode')
             print(f"{threading.current_thread().name}: JSON decode failure ({exc}); attempting captcha solve.")
             solve_turnstile(page)
         except PlaywrightTimeoutError:
+            FETCH_RETRIES.inc(reason='timeout')
             print(f"{threading.current_thread().name}: Navigation timed out for {url}; retrying.")
             solve_turnstile(page)
         except PlaywrightError as exc:
+            FETCH_RETRIES.inc(reason='playwright')
             print(f"{threading.current_thread().name}: Playwright error for {url}: {exc}")
             break
     return None
 
 
-def parse_topics(topics: Iterable[dict]) -> Set[Tuple[int, int]]:
-    """Extract `(id, posts_count)` tuples from topic payload."""
-    extracted: Set[Tuple[int, int]] = set()
+def decode_window_texts(texts: Sequence[str], seconds: float) -> List[dict]:
+    """Decode `FETCH_WINDOW_SCRIPT` results up to the first failed page."""
+    payloads: List[dict] = []
+    for text in texts:
+        if not text:
+            break
+        record_fetch('page-window', seconds / len(texts), len(text.encode('utf-8')))
+        try:
+            payloads.append(decode_topic_payload(text, True))
+        except ValueError:
+            break
+    return payloads
+
+
+def fetch_payload_window(page, urls: Sequence[str], priority: int = PRIORITY_BACKFILL) -> List[dict]:
+    """Fetch several latest.json pages concurrently from inside `page`.
+
+    `page` must already be on `BASE_URL`'s origin so the fetches carry its
+    cookies. Each fetch, body included, is aborted after `NAVIGATION_TIMEOUT`.
+    Returns the decoded payloads up to the first page that failed (challenge,
+    network error, timeout), possibly none; each page costs one token.
+    """
+    for _ in urls:
+        if not budget.acquire(priority, stop_event):
+            return []
+    started = time.perf_counter()
+    try:
+        texts = page.evaluate(
+            FETCH_WINDOW_SCRIPT,
+            {'urls': list(urls), 'fields': list(TOPIC_FIELDS), 'timeoutMs': NAVIGATION_TIMEOUT},
+        )
+        browser_recycling.count_fetches(len(urls))
+    except PlaywrightError as exc:
+        print(f"{threading.current_thread().name}: Windowed fetch error: {exc}")
+        return []
+    return decode_window_texts(texts, time.perf_counter() - started)
+
+
+def on_forum_origin(page) -> bool:
+    return page.url.startswith(BASE_URL + '/')
+
+
+def _optional_int(value) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _optional_str(value) -> Optional[str]:
+    return value if isinstance(value, str) else None
+
+
+def _topic_values(topic) -> Optional[Sequence]:
+    """`TOPIC_FIELDS` values of a projected row or a raw topic dict."""
+    if isinstance(topic, dict):
+        return [topic.get(field) for field in TOPIC_FIELDS]
+    if isinstance(topic, (list, tuple)) and len(topic) == TOPIC_ROW_WIDTH:
+        return topic
+    return None
+
+
+def parse_topic_rows(topics: Iterable) -> Dict[int, TopicRow]:
+    """Extract a `TopicRow` per topic id from projected rows or raw topic dicts."""
+    extracted: Dict[int, TopicRow] = {}
     for topic in topics:
+        values = _topic_values(topic)
         try:
-            topic_id = int(topic['id'])
-            posts_count = int(topic.get('posts_count', 0))
-            extracted.add((topic_id, posts_count))
-        except (KeyError, TypeError, ValueError):
+            topic_id = int(values[0])
+            posts_count = int(values[1] if values[1] is not None else 0)
+        except (TypeError, ValueError):
             continue
+        extracted[topic_id] = (
+            topic_id,
+            posts_count,
+            _optional_int(values[2]),
+            _optional_str(values[3]),
+            _optional_str(values[4]),
+            _optional_int(values[5]),
+        )
     return extracted
 
 
-def handle_topics(topics_payload: Iterable[dict], thread_name: str) -> None:
-    """Persist new or updated topic entries."""
-    current_data = parse_topics(topics_payload)
-    print(f"Thread {thread_name}: Got {len(current_data)} ID/posts_count pairs.")
-    if not current_data:
-        return
+def parse_topics(topics: Iterable) -> Set[Tuple[int, int]]:
+    """Extract `(id, posts_count)` tuples from topic payload."""
+    return {(row[0], row[1]) for row in parse_topic_rows(topics).values()}
+
+
+def latest_bump(topics: Iterable) -> str:
+    """Return the newest `bumped_at` timestamp on a page, or an empty string."""
+    newest = ''
+    for topic in topics:
+        values = _topic_values(topic)
+        bumped_at = values[3] if values is not None else None
+        if isinstance(bumped_at, str) and bumped_at > newest:
+            newest = bumped_at
+    return newest
+
+
+def handle_topics(topics_payload: Iterable, thread_name: str) -> int:
+    """Persist new or updated topic entries and return how many changed."""
+    with PARSE_SECONDS.time():
+        rows = parse_topic_rows(topics_payload)
+    print(f"Thread {thread_name}: Got {len(rows)} ID/posts_count pairs.")
+    PAGES_PROCESSED.inc(worker=thread_name)
+    TOPICS_SEEN.inc(len(rows))
+    if not rows:
+        return 0
     with id_set_lock:
-        delta = current_data - id_data_set
-        if not delta:
-            return
-        id_data_set.update(delta)
-    add_or_update_ids_in_db(list(delta))
+        delta = topic_index.diff_and_update((row[0], row[1]) for row in rows.values())
+        backfill = topic_index.take_backfill(rows)
+    if delta:
+        add_or_update_ids_in_db([rows[topic_id] for topic_id, _ in delta])
+        TOPICS_CHANGED.inc(len(delta))
+    backfill.difference_update(topic_id for topic_id, _ in delta)
+    if backfill:
+        add_or_update_ids_in_db([rows[topic_id] for topic_id in backfill], record_change=False)
+    return len(delta)
+
+
+def latest_url(pg_num: int) -> str:
+    return f"{BASE_URL}/latest.json?no_definitions=true&page={pg_num}"
+
+
+def report_monitor_stats(name: str, cache: ResponseCache, scheduler: PollScheduler) -> None:
+    print(
+        f"Thread {name}: Response cache {cache.hits} hits / "
+        f"{cache.misses} misses ({cache.hit_rate():.0%}); transports {transport_stats.summary()}; "
+        f"poll interval {scheduler.interval:.1f}s at {scheduler.change_rate * 60:.2f} changes/min."
+    )
+
+
+def consume_monitor_payload(payload: dict, pg_num: int, name: str) -> Optional[int]:
+    """Handle one monitor poll; returns changed topics, or None on invalid_parameters."""
+    if payload.get('error_type') == 'invalid_parameters':
+        print(f"Thread {name}: Received 'invalid_parameters' for page {pg_num}.")
+        return None
+    topics = payload.get('topic_list', {}).get('topics') if isinstance(payload, dict) else None
+    if not topics:
+        print(f"Thread {name}: Unexpected response format on page {pg_num}")
+        return 0
+    return handle_topics(topics, name)
 
 
 def monitor_pages(page) -> None:
     """Watch the latest feed pages (0 & 1)."""
-    print(f"Thread {threading.current_thread().name} started, monitoring pages 0 and 1.")
+    name = threading.current_thread().name
+    print(f"Thread {name} started, monitoring pages 0 and 1.")
+    cache = ResponseCache()
+    scheduler = PollScheduler()
+    polls = 0
     while not stop_event.is_set():
+        heartbeat.beat()
+        page = browser_recycling.checkpoint(page)
+        profiling.trace_checkpoint(page)
+        changes = 0
         for pg_num in (0, 1):
             if stop_event.is_set():
                 break
-            url = f"https://linux.do/latest.json?no_definitions=true&page={pg_num}"
-            payload = fetch_json_payload(page, url)
-            if payload is None:
+            payload = fetch_json_payload(page, latest_url(pg_num), cache, PRIORITY_MONITOR)
+            polls += 1
+            if polls % CACHE_REPORT_EVERY == 0:
+                report_monitor_stats(name, cache, scheduler)
+            if payload is None or payload is UNCHANGED:
                 continue
-            if payload.get('error_type') == 'invalid_parameters':
-                print(f"Thread {threading.current_thread().name}: Received 'invalid_parameters' for page {pg_num}.")
+            changed = consume_monitor_payload(payload, pg_num, name)
+            if changed is None:
                 stop_event.set()
                 return
-            topics = payload.get('topic_list', {}).get('topics') if isinstance(payload, dict) else None
-            if not topics:
-                print(f"Thread {threading.current_thread().name}: Unexpected response format on page {pg_num}")
-                continue
-            handle_topics(topics, threading.current_thread().name)
-        wait_with_stop(1)
-    print(f"Thread {threading.current_thread().name} finished.")
+            changes += changed
+        wait_with_stop(scheduler.observe(changes))
+    print(f"Thread {name} finished.")
 
 
-def enumerator_run(page, start_page: int) -> bool:
-    """Enumerate older pages until an invalid_parameters response."""
-    print(f"Thread {threading.current_thread().name} (Single Run) started from page {start_page}.")
-    pg_num = start_page
-    while not stop_event.is_set():
-        url = f"https://linux.do/latest.json?no_definitions=true&page={pg_num}"
-        payload = fetch_json_payload(page, url)
+class EnumerationPass:
+    """State of one enumeration cycle, shared by the thread and asyncio engines.
+
+    In incremental mode the walk also ends once `ENUMERATOR_QUIET_PAGES`
+    consecutive pages bring no changes and nothing bumped after the
+    previous cycle's high-water mark.
+
+    Each page's outcome is queued on `topic_writer` behind the page's rows;
+    a pass created after a crash or failure resumes its cycle (see
+    `open_crawl_cycle`) instead of walking from `start_page` again.
+    """
+
+    def __init__(self, start_page: int, incremental: bool, name: str) -> None:
+        self.cycle_id, self.pg_num, resumed_newest = open_crawl_cycle(start_page, incremental)
+        self.incremental = incremental
+        self.name = name
+        self.high_water = load_crawl_state('enumerator_high_water') or ''
+        self.newest_seen = max(self.high_water, resumed_newest)
+        self.quiet_pages = 0
+        self.window = max(1, ENUMERATOR_WINDOW)
+        mode = "incremental" if incremental else "full"
+        if self.pg_num != start_page:
+            print(f"Thread {name} (Single Run, {mode}) resumed cycle {self.cycle_id} at page {self.pg_num}.")
+            metrics.event('enumeration_resumed', worker=name, cycle=self.cycle_id, page=self.pg_num)
+        else:
+            print(f"Thread {name} (Single Run, {mode}) started cycle {self.cycle_id} from page {start_page}.")
+
+    def _record(self, outcome: str, topics: int = 0, changed: int = 0, status: Optional[str] = None) -> None:
+        topic_writer.submit_progress(
+            PageProgress(self.cycle_id, self.pg_num, outcome, topics, changed, self.newest_seen, status)
+        )
+
+    def url(self) -> str:
+        return latest_url(self.pg_num)
+
+    def urls(self, count: int) -> List[str]:
+        """URLs of the current page and the `count - 1` after it."""
+        return [latest_url(self.pg_num + offset) for offset in range(count)]
+
+    def consume(self, payload: Optional[dict]) -> Optional[bool]:
+        """Process the current page; True/False ends the pass, None moves to the next page."""
         if payload is None:
-            print(f"Thread {threading.current_thread().name}: Failed to fetch data for page {pg_num}, stopping enumeration.")
+            print(f"Thread {self.name}: Failed to fetch data for page {self.pg_num}, stopping enumeration.")
+            self._record('failed')
             return False
         if payload.get('error_type') == 'invalid_parameters':
-            print(f"Thread {threading.current_thread().name}: Received 'invalid_parameters' on page {pg_num}. Task completed.")
+            print(f"Thread {self.name}: Received 'invalid_parameters' on page {self.pg_num}. Task completed.")
+            self._record('end', status='completed')
+            save_crawl_state('enumerator_high_water', self.newest_seen)
+            metrics.event('enumeration_completed', worker=self.name, last_page=self.pg_num, incremental=self.incremental)
             return True
         topics = payload.get('topic_list', {}).get('topics') if isinstance(payload, dict) else None
         if not topics:
-            print(f"Thread {threading.current_thread().name}: Unexpected response format on page {pg_num}, stopping enumeration.")
+            print(f"Thread {self.name}: Unexpected response format on page {self.pg_num}, stopping enumeration.")
+            self._record('malformed')
             return False
-        handle_topics(topics, threading.current_thread().name)
-        pg_num += 1
-        wait_with_stop(1)
+        changed = handle_topics(topics, self.name)
+        page_bump = latest_bump(topics)
+        self.newest_seen = max(self.newest_seen, page_bump)
+        if changed or (page_bump and page_bump > self.high_water):
+            self.quiet_pages = 0
+        else:
+            self.quiet_pages += 1
+        if self.incremental and self.quiet_pages >= ENUMERATOR_QUIET_PAGES:
+            print(f"Thread {self.name}: {self.quiet_pages} quiet pages up to page {self.pg_num}. Incremental pass completed.")
+            self._record('ok', len(topics), changed, status='completed')
+            save_crawl_state('enumerator_high_water', self.newest_seen)
+            metrics.event('enumeration_completed', worker=self.name, last_page=self.pg_num, incremental=self.incremental)
+            return True
+        self._record('ok', len(topics), changed)
+        self.pg_num += 1
+        return None
+
+
+def fetch_enumeration_batch(page, enumeration: EnumerationPass) -> List[Optional[dict]]:
+    """Next payloads for `enumeration`: an in-page window of `enumeration.window` pages when possible.
+
+    The first page of a windowed pass is navigated to so the page lands on
+    the forum's origin. If a window fails outright, the rest of the pass
+    goes page by page through `fetch_json_payload` and its captcha handling.
+    """
+    if enumeration.window > 1 and on_forum_origin(page):
+        payloads = fetch_payload_window(page, enumeration.urls(enumeration.window))
+        if payloads:
+            return payloads
+        print(f"Thread {enumeration.name}: Windowed fetch failed on page {enumeration.pg_num}; continuing page by page.")
+        enumeration.window = 1
+    transport = 'page' if enumeration.window > 1 else None
+    return [fetch_json_payload(page, enumeration.url(), transport=transport)]
+
+
+def enumerator_run(page, start_page: int, incremental: bool = False) -> bool:
+    """Enumerate older pages until an invalid_parameters response (or quiet pages when incremental).
+
+    Pacing comes from the shared request `budget`, at backfill priority.
+    """
+    enumeration = EnumerationPass(start_page, incremental, threading.current_thread().name)
+    while not stop_event.is_set():
+        heartbeat.beat()
+        page = browser_recycling.checkpoint(page)
+        profiling.trace_checkpoint(page)
+        for payload in fetch_enumeration_batch(page, enumeration):
+            outcome = enumeration.consume(payload)
+            if outcome is not None:
+                return outcome
     print(f"Thread {threading.current_thread().name}: Stop signal received, ending enumeration.")
     return False
 
 
+def full_enumeration_due() -> bool:
+    """Whether the periodic full reconciliation walk should run now."""
+    last_full = load_crawl_state('last_full_enumeration')
+    try:
+        return time.time() - float(last_full) >= FULL_ENUMERATION_INTERVAL
+    except (TypeError, ValueError):
+        return True
+
+
+def record_browser_restart(worker: str, exc: BaseException) -> None:
+    BROWSER_RESTARTS.inc(worker=worker)
+    metrics.event('browser_restart', worker=worker, error=repr(exc))
+
+
+@contextmanager
+def recycled_crawler_page(context):
+    """Yield a page whose context `browser_recycling.checkpoint` rotates at the WATER_RECYCLE_* limits."""
+    with browser_recycling.recycled_page(
+        context,
+        lambda: open_crawler_context(context.browser),
+        NAVIGATION_TIMEOUT,
+        RECYCLE_NAVIGATIONS,
+        RECYCLE_RSS_MB,
+        RECYCLE_CHECK_SECONDS,
+    ) as page:
+        yield page
+
+
 def monitor_thread_worker():
     """Thread entry for page monitoring."""
     while not stop_event.is_set():
         try:
-            with camoufox_context() as context:
-                page = context.new_page()
-                page.set_default_timeout(NAVIGATION_TIMEOUT)
+            with camoufox_context() as context, recycled_crawler_page(context) as page:
                 monitor_pages(page)
-                page.close()
                 return
+        except browser_recycling.BrowserRestartRequested as exc:
+            print(f"Thread {threading.current_thread().name}: {exc}; relaunching the browser.")
         except Exception as exc:  # pylint: disable=broad-except
             if stop_event.is_set():
                 break
             print(f"Thread {threading.current_thread().name}: Monitor loop crashed: {exc}. Restarting in {RESTART_DELAY_SECONDS}s.")
+            record_browser_restart(threading.current_thread().name, exc)
             wait_with_stop(RESTART_DELAY_SECONDS)
 
 
@@ -218,15 +1264,20 @@ def enumerator_manager(start_page: int):
     """Thread entry for enumerating older pages."""
     while not stop_event.is_set():
         try:
-            with camoufox_context() as context:
-                page = context.new_page()
-                page.set_default_timeout(NAVIGATION_TIMEOUT)
-                completed = enumerator_run(page, start_page)
-                page.close()
+            with camoufox_context() as context, recycled_crawler_page(context) as page:
+                full = full_enumeration_due()
+                completed = enumerator_run(page, start_page, incremental=not full)
+                if completed and full:
+                    save_crawl_state('last_full_enumeration', str(time.time()))
+        except browser_recycling.BrowserRestartRequested as exc:
+            # The open crawl cycle resumes on the relaunched browser; no back-off needed.
+            print(f"Thread {threading.current_thread().name}: {exc}; relaunching the browser.")
+            continue
         except Exception as exc:  # pylint: disable=broad-except
             if stop_event.is_set():
                 break
             print(f"Thread {threading.current_thread().name}: Enumerator crashed: {exc}")
+            record_browser_restart(threading.current_thread().name, exc)
             completed = False
 
         if stop_event.is_set():
@@ -240,16 +1291,39 @@ def enumerator_manager(start_page: int):
             wait_with_stop(RESTART_DELAY_SECONDS)
 
 
+def open_fixture_store() -> None:
+    global fixture_store  # pylint: disable=global-statement
+    if FIXTURE_MODE not in ('record', 'replay'):
+        return
+    fixture_store = fixtures.FixtureStore(FIXTURE_PATH, FIXTURE_SPEED)
+    print(f"Fixture {FIXTURE_MODE} mode, {FIXTURE_PATH}: {fixture_store.summary()}.")
+
+
+def _request_stop(signum, frame):
+    print(f"\nReceived signal {signum}, stopping all threads...")
+    stop_event.set()
+
+
 def main():
+    metrics.start_exporters(METRICS_FILE, METRICS_PORT, EVENT_LOG)
+    if PROFILE_DIR:
+        profiling.install('water', PROFILE_DIR, PROFILE_SECONDS, CONTROL_SOCKET)
+    open_fixture_store()
     init_db()
+    topic_index.load(DB_PATH)
+    print(f"Preloaded {len(topic_index)} topics into the dedup index.")
+    topic_writer.start()
+    # start.py stops (and liveness-restarts) the crawler with SIGTERM; end the
+    # threads so the writer drains its queue and the browsers close.
+    signal.signal(signal.SIGTERM, _request_stop)
     monitor_thread = threading.Thread(target=monitor_thread_worker, name="MonitorPages01")
     enumerator_thread = threading.Thread(target=enumerator_manager, args=(2,), name="Thread2Manager")
     monitor_thread.start()
     enumerator_thread.start()
 
     try:
-        while monitor_thread.is_alive() and enumerator_thread.is_alive():
-            time.sleep(5)
+        while monitor_thread.is_alive() and enumerator_thread.is_alive() and not stop_event.is_set():
+            stop_event.wait(5)
     except KeyboardInterrupt:
         print("\nReceived interrupt signal, stopping all threads...")
         stop_event.set()
@@ -257,6 +1331,10 @@ def main():
     stop_event.set()
     monitor_thread.join()
     enumerator_thread.join()
+    topic_writer.stop()
+    if fixture_store is not None:
+        print(f"Fixture store {FIXTURE_PATH}: {fixture_store.summary()}.")
+        fixture_store.close()
     print("All threads stopped.")
 
 
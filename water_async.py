@@ -0,0 +1,342 @@
+"""Single-process asyncio engine for the crawler.
+
+Runs the monitor and enumerator as tasks on one Camoufox browser and one
+logged-in context, with the topic writer on a worker thread managed by the
+same event loop. Parsing, dedup, persistence and enumeration bookkeeping are
+shared with water.py; run this file instead of water.py to use it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import signal
+import time
+from contextlib import asynccontextmanager, suppress
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from camoufox.async_api import AsyncCamoufox
+from playwright.async_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+
+import metrics
+import profiling
+import water
+from camoufox_async_helpers import open_logged_in_context, solve_turnstile
+from request_budget import PRIORITY_BACKFILL, PRIORITY_MONITOR
+
+
+def task_name() -> str:
+    task = asyncio.current_task()
+    return task.get_name() if task else "MainTask"
+
+
+@asynccontextmanager
+async def camoufox_context():
+    """Yield a logged-in browser context."""
+    async with AsyncCamoufox(from_options=water.build_camoufox_options(), debug=water.CAMOUFOX_DEBUG) as browser:
+        context = await open_logged_in_context(
+            browser,
+            water.USERNAME,
+            water.PASSWORD,
+            water.SESSION_STATE_PATH,
+            timeout=water.NAVIGATION_TIMEOUT,
+            base_url=water.BASE_URL,
+            ignore_https_errors=True,
+        )
+        try:
+            yield context
+        finally:
+            await context.close()
+
+
+async def wait_with_stop(seconds: float) -> None:
+    """Sleep while respecting the global stop flag."""
+    end = time.time() + seconds
+    while not water.stop_event.is_set():
+        remaining = end - time.time()
+        if remaining <= 0:
+            break
+        await asyncio.sleep(min(1, remaining))
+
+
+async def acquire_budget(priority: int) -> bool:
+    """Take a token from `water.budget` without blocking the event loop."""
+    return await asyncio.to_thread(water.budget.acquire, priority, water.stop_event)
+
+
+async def trace_checkpoint(page) -> None:
+    """Async `profiling.trace_checkpoint`, keyed by task name."""
+    if profiling.profiler is None:
+        return
+    owner = task_name()
+    action, path = profiling.profiler.trace_action(owner)
+    if action is None:
+        return
+    try:
+        if action == 'start':
+            await page.context.tracing.start(screenshots=True, snapshots=True)
+            print(f"Profiling: tracing started for {owner}.")
+        else:
+            await page.context.tracing.stop(path=path)
+            print(f"Profiling: trace written to {path}.")
+    except PlaywrightError as exc:
+        print(f"Profiling: tracing {action} failed: {exc}")
+
+
+async def request_json_text(page, url: str) -> Tuple[Optional[bytes], Dict[str, str]]:
+    """Async `water.request_json_text`."""
+    started = time.perf_counter()
+    response = await page.request.get(url, headers={'Accept': 'application/json'}, timeout=water.NAVIGATION_TIMEOUT)
+    headers = response.headers
+    if 'json' not in headers.get('content-type', ''):
+        print(
+            f"{task_name()}: Request API got status {response.status} "
+            f"({headers.get('content-type', 'unknown')}) for {url}; falling back to navigation."
+        )
+        await response.dispose()
+        return None, headers
+    if not response.ok:
+        print(f"{task_name()}: Request API got status {response.status} for {url}.")
+    body = await response.body()
+    water.record_fetch('request', time.perf_counter() - started, len(body))
+    return body, headers
+
+
+async def navigate_json_text(
+    page, url: str, cache: Optional[water.ResponseCache] = None, project: bool = False
+) -> Tuple[Optional[str], Dict[str, str]]:
+    """Async `water.navigate_json_text`."""
+    started = time.perf_counter()
+    response = await page.goto(url, wait_until="domcontentloaded", timeout=water.NAVIGATION_TIMEOUT)
+    headers = response.headers if response is not None else {}
+    if cache is not None and cache.headers_unchanged(url, headers):
+        return None, headers
+    if project:
+        raw = await page.evaluate(water.PROJECT_TOPICS_SCRIPT, list(water.TOPIC_FIELDS))
+    else:
+        raw = await page.evaluate("() => document.body ? document.body.innerText : ''")
+    transport = 'page-projected' if project else 'page'
+    water.record_fetch(transport, time.perf_counter() - started, len(raw.encode('utf-8')) if raw else 0)
+    return raw, headers
+
+
+async def fetch_json_payload(
+    page,
+    url: str,
+    cache: Optional[water.ResponseCache] = None,
+    priority: int = PRIORITY_BACKFILL,
+    transport: Optional[str] = None,
+) -> Optional[dict]:
+    """Async `water.fetch_json_payload`."""
+    transport = transport or water.JSON_TRANSPORT
+    for _ in range(water.JSON_FETCH_RETRIES):
+        if not await acquire_budget(priority):
+            return None
+        try:
+            raw: Union[str, bytes, None] = None
+            projected = False
+            if transport == 'request':
+                raw, headers = await request_json_text(page, url)
+                if raw is not None and cache is not None and cache.headers_unchanged(url, headers):
+                    return water.UNCHANGED
+            if raw is None:
+                raw, headers = await navigate_json_text(page, url, cache, water.PROJECT_TOPICS)
+                if raw is None:
+                    return water.UNCHANGED
+                projected = water.PROJECT_TOPICS
+            if not raw:
+                raise ValueError("Empty response body.")
+            if cache is not None and cache.body_unchanged(url, raw):
+                return water.UNCHANGED
+            payload = water.decode_topic_payload(raw, projected)
+            if payload.get('error_type') == 'rate_limit':
+                wait = water.rate_limit_wait(headers)
+                water.FETCH_RETRIES.inc(reason='rate_limit')
+                print(f"{task_name()}: Rate limited on {url}; backing off {wait:.0f}s.")
+                await wait_with_stop(wait)
+                if water.stop_event.is_set():
+                    return None
+                continue
+            if cache is not None:
+                cache.remember(url, raw, headers)
+            return payload
+        except (ValueError, json.JSONDecodeError) as exc:
+            water.FETCH_RETRIES.inc(reason='decode')
+            print(f"{task_name()}: JSON decode failure ({exc}); attempting captcha solve.")
+            await solve_turnstile(page)
+        except PlaywrightTimeoutError:
+            water.FETCH_RETRIES.inc(reason='timeout')
+            print(f"{task_name()}: Navigation timed out for {url}; retrying.")
+            await solve_turnstile(page)
+        except PlaywrightError as exc:
+            water.FETCH_RETRIES.inc(reason='playwright')
+            print(f"{task_name()}: Playwright error for {url}: {exc}")
+            break
+    return None
+
+
+async def fetch_payload_window(page, urls: List[str], priority: int = PRIORITY_BACKFILL) -> List[dict]:
+    """Async `water.fetch_payload_window`."""
+    for _ in urls:
+        if not await acquire_budget(priority):
+            return []
+    started = time.perf_counter()
+    try:
+        texts = await page.evaluate(
+            water.FETCH_WINDOW_SCRIPT,
+            {'urls': urls, 'fields': list(water.TOPIC_FIELDS), 'timeoutMs': water.NAVIGATION_TIMEOUT},
+        )
+    except PlaywrightError as exc:
+        print(f"{task_name()}: Windowed fetch error: {exc}")
+        return []
+    return water.decode_window_texts(texts, time.perf_counter() - started)
+
+
+async def fetch_enumeration_batch(page, enumeration: water.EnumerationPass) -> List[Optional[dict]]:
+    """Async `water.fetch_enumeration_batch`."""
+    if enumeration.window > 1 and water.on_forum_origin(page):
+        payloads = await fetch_payload_window(page, enumeration.urls(enumeration.window))
+        if payloads:
+            return payloads
+        print(f"Task {enumeration.name}: Windowed fetch failed on page {enumeration.pg_num}; continuing page by page.")
+        enumeration.window = 1
+    transport = 'page' if enumeration.window > 1 else None
+    return [await fetch_json_payload(page, enumeration.url(), transport=transport)]
+
+
+async def monitor_pages(page) -> bool:
+    """Watch the latest feed pages (0 & 1); returns True once monitoring is over."""
+    name = task_name()
+    print(f"Task {name} started, monitoring pages 0 and 1.")
+    cache = water.ResponseCache()
+    scheduler = water.PollScheduler()
+    polls = 0
+    while not water.stop_event.is_set():
+        await trace_checkpoint(page)
+        changes = 0
+        for pg_num in (0, 1):
+            if water.stop_event.is_set():
+                break
+            payload = await fetch_json_payload(page, water.latest_url(pg_num), cache, PRIORITY_MONITOR)
+            polls += 1
+            if polls % water.CACHE_REPORT_EVERY == 0:
+                water.report_monitor_stats(name, cache, scheduler)
+            if payload is None or payload is water.UNCHANGED:
+                continue
+            changed = water.consume_monitor_payload(payload, pg_num, name)
+            if changed is None:
+                water.stop_event.set()
+                return True
+            changes += changed
+        await wait_with_stop(scheduler.observe(changes))
+    print(f"Task {name} finished.")
+    return True
+
+
+async def enumerator_cycles(page, start_page: int) -> bool:
+    """Run enumeration passes back to back; returns False when a pass fails."""
+    name = task_name()
+    while not water.stop_event.is_set():
+        full = water.full_enumeration_due()
+        enumeration = water.EnumerationPass(start_page, not full, name)
+        outcome: Optional[bool] = None
+        while outcome is None and not water.stop_event.is_set():
+            await trace_checkpoint(page)
+            for payload in await fetch_enumeration_batch(page, enumeration):
+                outcome = enumeration.consume(payload)
+                if outcome is not None:
+                    break
+        if not outcome:
+            return False
+        if full:
+            water.save_crawl_state('last_full_enumeration', str(time.time()))
+        print(f"Task {name}: Enumeration completed. Waiting {water.ENUMERATOR_DELAY} seconds.")
+        await wait_with_stop(water.ENUMERATOR_DELAY)
+    return True
+
+
+async def supervise(context, run: Callable[..., Awaitable[bool]], *args) -> None:
+    """Run `run(page, *args)` on a fresh page of `context`, restarting it after failures.
+
+    Errors opening a page propagate so the engine can replace the browser.
+    """
+    name = task_name()
+    while not water.stop_event.is_set():
+        page = await context.new_page()
+        page.set_default_timeout(water.NAVIGATION_TIMEOUT)
+        try:
+            if await run(page, *args):
+                return
+            print(f"Task {name}: Run failed. Restarting after {water.RESTART_DELAY_SECONDS} seconds.")
+        except PlaywrightError as exc:
+            print(f"Task {name}: Crashed: {exc}. Restarting in {water.RESTART_DELAY_SECONDS}s.")
+            water.record_browser_restart(name, exc)
+        finally:
+            with suppress(PlaywrightError):
+                await page.close()
+        await wait_with_stop(water.RESTART_DELAY_SECONDS)
+
+
+async def run_engine(start_page: int = 2) -> None:
+    """Run the crawl tasks until stopped, replacing the browser if it dies."""
+    if water.FIXTURE_MODE != 'off':
+        raise SystemExit(
+            f"WATER_FIXTURE_MODE={water.FIXTURE_MODE} is only supported by water.py; "
+            "the asyncio engine would crawl the live site instead."
+        )
+    metrics.start_exporters(water.METRICS_FILE, water.METRICS_PORT, water.EVENT_LOG)
+    if water.PROFILE_DIR:
+        profiling.install('water-async', water.PROFILE_DIR, water.PROFILE_SECONDS, water.CONTROL_SOCKET)
+    water.init_db()
+    water.topic_index.load(water.DB_PATH)
+    print(f"Preloaded {len(water.topic_index)} topics into the dedup index.")
+    writer = asyncio.create_task(asyncio.to_thread(water.topic_writer.run), name="TopicWriter")
+    crawl_tasks: List[asyncio.Task] = []
+
+    def request_stop() -> None:
+        print("\nReceived stop signal, cancelling crawl tasks...")
+        water.stop_event.set()
+        for task in crawl_tasks:
+            task.cancel()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, request_stop)
+
+    try:
+        while not water.stop_event.is_set():
+            try:
+                async with camoufox_context() as context:
+                    crawl_tasks[:] = [
+                        asyncio.create_task(supervise(context, monitor_pages), name="MonitorPages01"),
+                        asyncio.create_task(supervise(context, enumerator_cycles, start_page), name="Thread2Manager"),
+                    ]
+                    done, _pending = await asyncio.wait(crawl_tasks, return_when=asyncio.FIRST_COMPLETED)
+                    for task in crawl_tasks:
+                        task.cancel()
+                    await asyncio.gather(*crawl_tasks, return_exceptions=True)
+                    for task in done:
+                        if not task.cancelled() and task.exception() is not None:
+                            raise task.exception()
+                    if not water.stop_event.is_set():
+                        water.stop_event.set()
+            except Exception as exc:  # pylint: disable=broad-except
+                if water.stop_event.is_set():
+                    break
+                print(f"Engine: Browser crashed: {exc}. Restarting in {water.RESTART_DELAY_SECONDS}s.")
+                water.record_browser_restart("Engine", exc)
+                await wait_with_stop(water.RESTART_DELAY_SECONDS)
+    finally:
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(sig)
+        water.topic_writer.stop()
+        await writer
+    print("All tasks stopped.")
+
+
+def main():
+    asyncio.run(run_engine())
+
+
+if __name__ == "__main__":
+    main()